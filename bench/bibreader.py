@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark and equivalence check for the streaming BibTeX reader.
+
+Reads the repository's bibliography, a file of awkward but supported entries and
+synthetic bibliographies with both the streaming reader (filters/bibtex.py) and
+pybtex, checks that both produce the same paper records, and reports time and
+peak memory for each. Exits 1 if the records differ or the reader falls back.
+
+    python3 bench/bibreader.py               # main.bib, edge cases, 1k and 20k entries
+    python3 bench/bibreader.py 5000 50000    # other synthetic sizes
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'filters'))
+sys.path.insert(0, BENCH_DIR)
+
+import bibliography
+import bibtex
+import synthetic
+
+# Supported constructs whose pybtex reading is easy to get wrong
+EDGE_CASES = r'''
+Text outside entries is a comment.
+@comment{ignored, entirely}
+@preamble{"\newcommand{\noop}[1]{}"}
+@inproceedings{vonParts,
+  Author = {John Quincy Adams and Ludwig van Beethoven and de la Fontaine, Jean
+            and Smith, Jr., John and Ann van der berg and jean-paul Sartre AND Plato},
+  TITLE = {{UCLID5}: Multi-Modal   Formal
+     Modeling},
+  booktitle = "Proceedings of {CAV} (CAV)",
+  year = 2020,
+  month = jan,
+  note = "a" # " b",
+  selected = {True},
+}
+@article{noBooktitle, title = "Quoted {"}braces{"} and commas, too", journal = {Journal of Things (JoT)}, year = {2019}, url = {https://example.org/?a=1&b={2}}}
+@misc{noAuthors,
+  title = {Anonymous},
+  journal = {Somewhere},
+  year = "2018"
+}
+'''
+
+
+def measure(read, path):
+    """(records, seconds, peak bytes) of one read; memory is measured in a second run"""
+    start = time.perf_counter()
+    records = read(path)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        read(path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return records, seconds, peak
+
+
+def read_streaming(path):
+    return [bibliography.paper_from_fields(key, fields, authors) for key, fields, authors in bibtex.read(path)]
+
+
+def compare(name, path) -> bool:
+    fast, fast_seconds, fast_peak = measure(read_streaming, path)
+    slow, slow_seconds, slow_peak = measure(bibliography.parse_papers_pybtex, path)
+    same = [p.to_row() for p in fast] == [p.to_row() for p in slow]
+    print(
+        f"{name:<14} {len(fast):>6} entries  "
+        f"streaming {fast_seconds * 1000:8.1f} ms {fast_peak / 2**20:7.1f} MiB  "
+        f"pybtex {slow_seconds * 1000:8.1f} ms {slow_peak / 2**20:7.1f} MiB  "
+        f"({slow_seconds / fast_seconds:5.1f}x)  {'same' if same else 'DIFFERENT'}"
+    )
+    if not same:
+        for a, b in zip(fast, slow):
+            if a.to_row() != b.to_row():
+                print(f"  streaming: {a.to_row()}\n  pybtex:    {b.to_row()}")
+                break
+    return same
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 20_000]
+    ok = True
+    with tempfile.TemporaryDirectory(prefix='bibtex-bench-') as work_dir:
+        cases = [('main.bib', os.path.join(ROOT_DIR, 'main.bib'))]
+        edge = os.path.join(work_dir, 'edge.bib')
+        with open(edge, 'w', encoding='utf-8') as f:
+            f.write(EDGE_CASES)
+        cases.append(('edge cases', edge))
+        for n in sizes:
+            path = os.path.join(work_dir, f"synthetic-{n}.bib")
+            synthetic.write_bib(path, n)
+            cases.append((f"synthetic {n}", path))
+
+        for name, path in cases:
+            try:
+                ok &= compare(name, path)
+            except bibtex.Unsupported as e:
+                print(f"{name:<14} streaming reader fell back: {e}")
+                ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
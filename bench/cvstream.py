@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark and equivalence check for the CV filter's streaming mode.
+
+Writes synthetic CV documents with a growing number of 500-row tables, filters
+each with main(doc) after pf.load and with main_streaming (filters/streaming.py),
+checks that both write the same JSON, and reports time and peak memory for each.
+Exits 1 if the outputs differ.
+
+    python3 bench/cvstream.py                # 10k and 50k table rows
+    python3 bench/cvstream.py 20000 200000   # other sizes
+"""
+
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'filters'))
+sys.path.insert(0, BENCH_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix='cvstream-bench-')
+os.environ['SITE_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+
+import panflute as pf
+
+import cv
+import synthetic
+
+PAPERS = 1_000
+ROWS_PER_TABLE = 500
+
+
+class HashWriter:
+    """Text sink that keeps only a hash and the length of what was written"""
+
+    def __init__(self):
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text):
+        self.hash.update(text.encode())
+        self.size += len(text)
+
+    def flush(self):
+        pass
+
+
+def filter_loaded(path, out):
+    with open(path, encoding='utf-8') as f:
+        doc = pf.load(f)
+    doc.format = 'html'
+    pf.dump(cv.main(doc), out)
+
+
+def filter_streaming(path, out):
+    with open(path, encoding='utf-8') as f:
+        cv.main_streaming(f, out, 'html')
+
+
+def measure(run, path):
+    """(output hash, seconds, peak bytes) of one run; memory is measured in a second run"""
+    with contextlib.redirect_stderr(io.StringIO()):
+        out = HashWriter()
+        start = time.perf_counter()
+        run(path, out)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        try:
+            run(path, HashWriter())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return out.hash.hexdigest(), seconds, peak
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000]
+    bib_file = os.path.join(WORK_DIR, 'main.bib')
+    synthetic.write_bib(bib_file, PAPERS)
+    ok = True
+    for rows in sizes:
+        path = os.path.join(WORK_DIR, f"cv-{rows}.json")
+        doc = synthetic.cv_doc(bib_file, rows, n_tables=max(1, rows // ROWS_PER_TABLE))
+        with open(path, 'w', encoding='utf-8') as f:
+            pf.dump(doc, f)
+        del doc
+
+        loaded, loaded_seconds, loaded_peak = measure(filter_loaded, path)
+        streamed, streamed_seconds, streamed_peak = measure(filter_streaming, path)
+        same = loaded == streamed
+        ok &= same
+        print(
+            f"{rows:>7} rows {os.path.getsize(path) / 2**20:6.1f} MiB  "
+            f"pf.load {loaded_seconds:6.2f} s {loaded_peak / 2**20:7.1f} MiB  "
+            f"streaming {streamed_seconds:6.2f} s {streamed_peak / 2**20:7.1f} MiB  "
+            f"{'same' if same else 'DIFFERENT'}"
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark suite for the index and CV filters at production scale.
+
+Generates synthetic bibliographies, news directories and CV tables, runs each
+filter through main(doc=...) without pandoc, and reports wall time and peak
+memory for the prepare, action and finalize phases. Results are compared
+against a stored baseline to catch regressions.
+
+    python3 bench/filters.py                 # full suite, compare with baseline
+    python3 bench/filters.py --quick         # smallest size of each case
+    python3 bench/filters.py --save-baseline # record the current results
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'filters'))
+sys.path.insert(0, BENCH_DIR)
+
+# Keep the filters' caches out of the repository's .cache
+WORK_DIR = tempfile.mkdtemp(prefix='filter-bench-')
+os.environ['SITE_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+
+import panflute as pf
+
+import bibliography
+import cv
+import images
+import index
+import synthetic
+
+PHASES = ('prepare', 'action', 'finalize')
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, '.cache', 'bench', 'baseline.json')
+# Flag a phase when it is this much slower/larger than the baseline...
+THRESHOLD = 1.25
+# ...and the difference is above these floors (ignores noise on tiny phases)
+MIN_SECONDS = 0.005
+MIN_BYTES = 256 * 1024
+
+HEADSHOT = os.path.join(ROOT_DIR, 'docs', 'images', 'federico.jpg')
+
+# (case name, filter module, papers, posts, cv table rows)
+CASES = [
+    ('index-papers', index, [100, 1_000, 5_000, 20_000], 100, 0),
+    ('index-news', index, 100, [100, 1_000, 10_000], 0),
+    ('cv-papers', cv, [100, 1_000, 5_000, 20_000], 0, 200),
+    ('cv-tables', cv, 100, 0, [1_000, 10_000, 20_000]),
+]
+
+
+class PhaseRecorder:
+    """Wraps a filter's prepare/action/finalize and records per-phase time and peak memory"""
+
+    def __init__(self, module, trace_memory: bool):
+        self.module = module
+        self.trace_memory = trace_memory
+        self.results = {}
+        self.phase = None
+        self.started = 0.0
+
+    def mark(self, phase):
+        """Close the current phase (if any) and open the next one"""
+        now = time.perf_counter()
+        if self.phase is not None:
+            key = 'peak_bytes' if self.trace_memory else 'seconds'
+            value = tracemalloc.get_traced_memory()[1] if self.trace_memory else now - self.started
+            self.results.setdefault(self.phase, {})[key] = value
+        self.phase = phase
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+
+    def run(self, doc):
+        prepare, finalize = self.module.prepare, self.module.finalize
+
+        def timed_prepare(doc):
+            self.mark('prepare')
+            prepare(doc)
+            self.mark('action')
+
+        def timed_finalize(doc):
+            self.mark('finalize')
+            finalize(doc)
+            self.mark(None)
+
+        # main() looks these up at call time, so patching the module is enough
+        self.module.prepare, self.module.finalize = timed_prepare, timed_finalize
+        try:
+            self.module.main(doc)
+        finally:
+            self.module.prepare, self.module.finalize = prepare, finalize
+        return self.results
+
+
+def make_inputs(name, papers, posts, rows):
+    """Write the synthetic inputs for one case and return its serialized document"""
+    case_dir = os.path.join(WORK_DIR, name)
+    os.makedirs(case_dir, exist_ok=True)
+    bib_file = os.path.join(case_dir, 'main.bib')
+    synthetic.write_bib(bib_file, papers)
+    if name.startswith('index'):
+        news_dir = os.path.join(case_dir, 'posts')
+        synthetic.write_news(news_dir, posts)
+        # The headshot and its variants live in the case directory, not in docs/
+        headshot = os.path.join(case_dir, 'images', 'federico.jpg')
+        os.makedirs(os.path.dirname(headshot), exist_ok=True)
+        shutil.copyfile(HEADSHOT, headshot)
+        with contextlib.redirect_stderr(io.StringIO()):
+            images.variants(headshot)
+        doc = synthetic.index_doc(bib_file, news_dir, case_dir)
+    else:
+        doc = synthetic.cv_doc(bib_file, rows)
+    out = io.StringIO()
+    pf.dump(doc, out)
+    return out.getvalue()
+
+
+def reset_caches():
+    """
+    Start every run cold: no in-process records and no on-disk caches, except
+    the encoded images (encoding the headshot is not what this suite measures)
+    """
+    bibliography._loaded.clear()
+    bibliography.author_runs.cache_clear()
+    cache_dir = os.environ['SITE_CACHE_DIR']
+    for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+        if name != 'images':
+            path = os.path.join(cache_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+
+def run_case(module, ast, repeat):
+    """Best-of-`repeat` timings, then one run under tracemalloc for peak memory"""
+    results = {phase: {'seconds': float('inf')} for phase in PHASES}
+    with contextlib.redirect_stderr(io.StringIO()):
+        for _ in range(repeat):
+            reset_caches()
+            doc = pf.load(io.StringIO(ast))
+            for phase, r in PhaseRecorder(module, False).run(doc).items():
+                results[phase]['seconds'] = min(results[phase]['seconds'], r['seconds'])
+
+        reset_caches()
+        doc = pf.load(io.StringIO(ast))
+        tracemalloc.start()
+        try:
+            for phase, r in PhaseRecorder(module, True).run(doc).items():
+                results[phase]['peak_bytes'] = r['peak_bytes']
+        finally:
+            tracemalloc.stop()
+    return results
+
+
+def sizes(value, quick):
+    if isinstance(value, list):
+        return value[:1] if quick else value
+    return [value]
+
+
+def compare(name, results, baseline):
+    """Return the list of regressions of `results` against the baseline entry"""
+    regressions = []
+    for phase, r in results.items():
+        base = baseline.get(name, {}).get(phase)
+        if not base:
+            continue
+        if r['seconds'] > base['seconds'] * THRESHOLD and r['seconds'] - base['seconds'] > MIN_SECONDS:
+            regressions.append(f"{name} {phase}: {base['seconds'] * 1000:.1f} ms → {r['seconds'] * 1000:.1f} ms")
+        if r['peak_bytes'] > base['peak_bytes'] * THRESHOLD and r['peak_bytes'] - base['peak_bytes'] > MIN_BYTES:
+            regressions.append(f"{name} {phase}: {base['peak_bytes'] / 2**20:.1f} MiB → {r['peak_bytes'] / 2**20:.1f} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the index and CV filters on synthetic inputs")
+    parser.add_argument('--quick', action='store_true', help="run only the smallest size of each case")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per case (best is kept)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline results file")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this string")
+    args = parser.parse_args()
+
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+
+    all_results = {}
+    regressions = []
+    try:
+        for case, module, papers, posts, rows in CASES:
+            for p in sizes(papers, args.quick):
+                for n in sizes(posts, args.quick):
+                    for r in sizes(rows, args.quick):
+                        name = f"{case}/papers={p},posts={n},rows={r}"
+                        if args.filter not in name:
+                            continue
+                        ast = make_inputs(case, p, n, r)
+                        results = run_case(module, ast, args.repeat)
+                        all_results[name] = results
+                        print(name)
+                        for phase in PHASES:
+                            print(f"  {phase:<9} {results[phase]['seconds'] * 1000:9.1f} ms  {results[phase]['peak_bytes'] / 2**20:8.1f} MiB peak")
+                        regressions += compare(name, results, baseline)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({**baseline, **all_results}, f, indent=1)
+        print(f"\nbaseline → {args.baseline}")
+    elif not baseline:
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline to record one")
+
+    if regressions:
+        print("\nregressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""
+Offline check of the link checker (builder/links.py) against a local stand-in server.
+
+Serves ok, missing, redirecting, looping, slow, HEAD-refusing and bot-blocking
+URLs on 127.0.0.1, checks them together with a batch of slow pages on one host,
+and verifies each result, the per-host connection limit, keep-alive reuse and
+the TTL cache. Reports the time taken; exits 1 if anything is off.
+
+    python3 bench/linkcheck.py         # 200 pages on the busy host
+    python3 bench/linkcheck.py 1000    # another number
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix='linkcheck-bench-')
+os.environ['SITE_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+
+from builder import links
+
+PER_HOST = 4
+TIMEOUT = 0.5
+PAGE_DELAY = 0.01
+
+
+class Stats:
+    lock = threading.Lock()
+    connections = 0
+    requests = 0
+    active = 0
+    max_active = 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with Stats.lock:
+            Stats.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, location=None, body=b''):
+        self.send_response(status)
+        if location:
+            self.send_header('Location', location)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command == 'GET':
+            self.wfile.write(body)
+
+    def route(self):
+        path = self.path
+        if path == '/ok':
+            self.reply(200, body=b'ok')
+        elif path == '/missing':
+            self.reply(404)
+        elif path == '/moved':
+            self.reply(301, location='/ok')
+        elif path == '/loop':
+            self.reply(302, location='/loop')
+        elif path == '/slow':
+            time.sleep(TIMEOUT * 3)
+            self.reply(200)
+        elif path == '/nohead':
+            self.reply(405 if self.command == 'HEAD' else 200, body=b'ok')
+        elif path == '/blocked':
+            self.reply(403)
+        elif path.startswith('/page/'):
+            time.sleep(PAGE_DELAY)
+            self.reply(200)
+        else:
+            self.reply(404)
+
+    def handle_request(self):
+        with Stats.lock:
+            Stats.requests += 1
+            Stats.active += 1
+            Stats.max_active = max(Stats.max_active, Stats.active)
+        try:
+            self.route()
+        finally:
+            with Stats.lock:
+                Stats.active -= 1
+
+    do_HEAD = do_GET = handle_request
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    # "localhost" is another host to the checker, with a pool of its own
+    other = f"http://localhost:{server.server_address[1]}"
+
+    expected = {
+        f"{base}/ok": ('ok', 200),
+        f"{base}/missing": ('broken', 404),
+        f"{base}/moved": ('ok', 200),
+        f"{base}/loop": ('broken', None),
+        f"{base}/slow": ('broken', None),
+        f"{base}/nohead": ('ok', 200),
+        f"{other}/blocked": ('blocked', 403),
+        "http://127.0.0.1:9/refused": ('broken', None),
+    }
+    for i in range(pages):
+        expected[f"{base}/page/{i}"] = ('ok', 200)
+    urls = list(expected)
+    limits = {'per_host': PER_HOST, 'timeout': TIMEOUT}
+
+    ok = True
+    start = time.perf_counter()
+    results, requested = links.check_links(urls, **limits)
+    elapsed = time.perf_counter() - start
+    for url, (state, status) in expected.items():
+        result = results[url]
+        if result['state'] != state or result['status'] != status:
+            print(f"  {url}: expected {state} {status}, got {result['state']} {links.describe(result)}")
+            ok = False
+    serial = pages * PAGE_DELAY
+    print(f"{len(urls)} links in {elapsed:.2f}s (the pages alone take {serial:.2f}s one at a time), "
+          f"{Stats.requests} requests over {Stats.connections} connections, "
+          f"at most {Stats.max_active} at once (limit {PER_HOST} per host)")
+    # The slow page still holds its connection to 127.0.0.1 after timing out
+    if Stats.max_active > PER_HOST + 1:
+        print("  per-host limit exceeded")
+        ok = False
+    if Stats.connections >= Stats.requests:
+        print("  no connection was reused")
+        ok = False
+
+    _, again = links.check_links(urls, **limits)
+    broken = sum(state == 'broken' for state, _ in expected.values())
+    print(f"second run: {again} checked (the {broken} broken links), {len(urls) - again} cached")
+    ok &= again == broken
+
+    _, expired = links.check_links(urls, now=time.time() + links.TTL + 1, **limits)
+    print(f"after the TTL: {expired} checked")
+    ok &= expired == len(urls)
+
+    server.shutdown()
+    print("ok" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
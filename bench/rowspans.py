@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark and self-check for collapse_rowspans on synthetic CV tables.
+Each table mixes plain rows, two-row spans (like the CV's education and
+mentoring tables) and overlapping three-column spans. Small tables with
+overlapping rowspans, colspans and ragged continuation rows are collapsed
+first and compared with their expected rows; exits 1 if any differs.
+
+    python3 bench/rowspans.py                # 1k, 10k and 50k rows
+    python3 bench/rowspans.py 200000         # other sizes
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filters'))
+
+import panflute as pf
+from tables import collapse_rowspans
+
+
+def cell(text, rowspan=1, colspan=1):
+    return pf.TableCell(pf.Plain(pf.Str(text)), rowspan=rowspan, colspan=colspan)
+
+
+def synthetic_body(n_rows: int) -> pf.TableBody:
+    """Build a 3-column table body with about n_rows rows"""
+    rows = []
+    i = 0
+    while len(rows) < n_rows:
+        match i % 3:
+            case 0:
+                # Plain row
+                rows.append(pf.TableRow(cell(f"{i}"), cell("role"), cell("detail")))
+            case 1:
+                # Right cell spans two rows; continuation holds the first two columns
+                rows.append(pf.TableRow(cell(f"{i}"), cell("role"), cell("detail", rowspan=2)))
+                rows.append(pf.TableRow(cell(""), cell("more")))
+            case 2:
+                # Overlapping spans: col 0 spans three rows, col 2 starts a span in row two
+                rows.append(pf.TableRow(cell(f"{i}", rowspan=3), cell("a"), cell("b")))
+                rows.append(pf.TableRow(cell("c"), cell("d", rowspan=2)))
+                rows.append(pf.TableRow(cell("e")))
+        i += 1
+    return pf.TableBody(*rows)
+
+
+# (name, rows of cells as text or (text, rowspan, colspan), expected rows after collapsing)
+# A merged cell reads "first|second|...", one part per block it holds
+CHECKS = [
+    ('plain rows',
+     [['a', 'b', 'c'], ['d', 'e', 'f']],
+     [['a', 'b', 'c'], ['d', 'e', 'f']]),
+    ('two-row span',
+     [['a', 'b', ('c', 2, 1)], ['d', 'e']],
+     [['a|d', 'b|e', 'c']]),
+    ('overlapping spans',
+     [[('a', 3, 1), 'b', 'c'], ['d', ('e', 2, 1)], ['f']],
+     [['a', 'b|d|f', 'c|e']]),
+    ('span starting in a continuation row',
+     [['a', ('b', 2, 1)], [('c', 2, 1)], ['d'], ['e', 'f']],
+     [['a|c', 'b|d'], ['e', 'f']]),
+    ('colspan in the first row',
+     [[('a', 1, 2), ('b', 2, 1)], ['c', 'd']],
+     [['a|c|d', 'b']]),
+    ('colspan in a continuation row',
+     [['a', 'b', ('c', 2, 1)], [('d', 1, 2)]],
+     [['a|d', 'b', 'c']]),
+    ('ragged continuation row',
+     [['a', ('b', 2, 1)], ['c', 'd', 'e']],
+     [['a|c', 'b', 'd', 'e']]),
+    ('span past the last row',
+     [['x', 'y'], [('a', 3, 1)], ['b']],
+     [['x', 'y'], ['a', 'b']]),
+]
+
+
+def build(spec) -> pf.TableBody:
+    return pf.TableBody(*(
+        pf.TableRow(*(cell(c) if isinstance(c, str) else cell(*c) for c in row))
+        for row in spec
+    ))
+
+
+def texts(body: pf.TableBody):
+    return [['|'.join(pf.stringify(block) for block in c.content) for c in row.content] for row in body.content]
+
+
+def check() -> bool:
+    """Collapse each of CHECKS and compare its rows (and rowspans) with the expected ones"""
+    ok = True
+    for name, spec, expected in CHECKS:
+        body = collapse_rowspans(build(spec))
+        got = texts(body)
+        spans = [c.rowspan for row in body.content for c in row.content]
+        if got != expected or any(span != 1 for span in spans):
+            print(f"  {name}: expected {len(expected)} rows {expected}, got {len(got)} rows {got} (rowspans {spans})")
+            ok = False
+    print(f"{len(CHECKS)} tables checked: {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 50_000]
+    ok = check()
+    for n in sizes:
+        body = synthetic_body(n)
+        cells = sum(len(row.content) for row in body.content)
+        start = time.perf_counter()
+        collapse_rowspans(body)
+        elapsed = time.perf_counter() - start
+        print(f"rows={n:>7}  cells={cells:>7}  kept={len(body.content):>7}  {elapsed * 1000:8.1f} ms  ({elapsed / cells * 1e6:.2f} µs/cell)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Synthetic inputs for the filter benchmarks: bibliographies, news directories
+and index/CV documents at production scale. Generation is deterministic.
+"""
+
+import os
+import random
+
+import panflute as pf
+
+from rowspans import synthetic_body
+
+VENUES = [
+    "International Conference on Computer-Aided Verification (CAV)",
+    "Annual Conference on Neural Information Processing Systems (NeurIPS)",
+    "AAAI Conference on Artificial Intelligence (AAAI)",
+    "Proceedings of the ACM on Programming Languages (OOPSLA)",
+    "Formal Methods in Computer-Aided Design (FMCAD)",
+    "Workshop on Synthesis (SYNT)",
+]
+
+
+def author_pool(n=500, seed=0):
+    rng = random.Random(seed)
+    firsts = ["Ada", "Alan", "Barbara", "Edsger", "Grace", "Leslie", "Robin", "Tony", "Frances", "John"]
+    return [(f"Last{i}", rng.choice(firsts) + (" Q." if i % 7 == 0 else "")) for i in range(n)]
+
+
+def write_bib(path, n_entries, max_authors=30, seed=0):
+    """Write a bibtex file with n_entries papers and up to max_authors authors each"""
+    rng = random.Random(seed)
+    pool = author_pool(seed=seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n_entries):
+            authors = rng.sample(pool, rng.randint(1, max_authors))
+            venue_field = 'journal' if i % 5 == 0 else 'booktitle'
+            f.write(
+                f"@inproceedings{{paper{i},\n"
+                f"    author        = {{{' and '.join(f'{last}, {first}' for last, first in authors)}}},\n"
+                f"    title         = {{Synthetic Paper Number {i} on {{SMT}} Solving}},\n"
+                f"    {venue_field:<13} = \"{rng.choice(VENUES)}\",\n"
+                f"    year          = \"{rng.randint(2010, 2026)}\",\n"
+                f"    url           = {{https://example.org/papers/{i}.pdf}},\n"
+                f"    selected      = \"{'true' if i % 10 == 0 else 'false'}\"\n"
+                f"}}\n"
+            )
+
+
+def write_news(news_dir, n_posts, seed=0):
+    """Write n_posts news posts with date/title headers and a short body"""
+    rng = random.Random(seed)
+    os.makedirs(news_dir, exist_ok=True)
+    for i in range(n_posts):
+        with open(os.path.join(news_dir, f"post-{i}.md"), 'w', encoding='utf-8') as f:
+            f.write(
+                "---\n"
+                f"title: Synthetic news item {i}\n"
+                f"date: {rng.randint(1, 12):02d}/{rng.randint(2010, 2026)}\n"
+                "---\n\n"
+                + "Some *body* text with a [link](https://example.org). " * 20 + "\n"
+            )
+
+
+def index_doc(bib_file, news_dir, output_dir) -> pf.Doc:
+    """A document shaped like index.md; the headshot is read from (and its variants written to) output_dir"""
+    return pf.Doc(
+        pf.Header(pf.Str("Profile"), level=1, identifier='profile'),
+        pf.Para(pf.Str("Blurb.")),
+        pf.Para(pf.Str("More.")),
+        pf.Header(pf.Str("News"), level=1, identifier='news'),
+        pf.Header(pf.Str("Publications"), level=1, identifier='publications'),
+        pf.Header(pf.Str("Group"), level=1, identifier='group'),
+        pf.Para(pf.Str("Join us.")),
+        metadata={
+            'news': news_dir,
+            'papers': bib_file,
+            'authors': False,
+            'headshot': 'images/federico.jpg',
+            'email': 'someone@example.org',
+            'output-dir': output_dir,
+        },
+    )
+
+
+def cv_doc(bib_file, table_rows, n_tables=4) -> pf.Doc:
+    """A document shaped like cv.md with n_tables large two-row-span tables"""
+    blocks = [
+        pf.Header(pf.Str("Research"), level=1, identifier='research'),
+        pf.Header(pf.Str("Publications"), level=2, identifier='publications'),
+        pf.Para(pf.Str("Refereed papers.")),
+    ]
+    for t in range(n_tables):
+        blocks.append(pf.Header(pf.Str(f"Service {t}"), level=2, identifier=f'service-{t}'))
+        blocks.append(pf.Table(synthetic_body(table_rows // n_tables)))
+    return pf.Doc(*blocks, metadata={
+        'papers': bib_file,
+        'students': ['Last1 Ada', 'Last14 Grace Q.'],
+    })
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+"""
+Incremental build for the website.
+Rebuilds only the outputs under docs/ whose inputs changed since the last build
+and removes outputs whose sources disappeared. Stale outputs are rendered in
+parallel by a bounded pool of pandoc processes; with --in-process the filters
+run inside this interpreter instead of one interpreter per pandoc call.
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
+
+from builder import assets, inprocess, links, optimize, pipeline, reproducible
+from builder.manifest import Manifest
+from builder.targets import Target, all_targets
+from builder.watch import Reloader, make_watcher, serve
+
+# Color codes
+RED = "\033[31m"; GREEN = "\033[32m"; YELLOW = "\033[33m"; MAGENTA = "\033[35m"; CYAN = "\033[36m"; BOLD = "\033[1m"; RESET = "\033[0m"
+
+print_lock = threading.Lock()
+
+
+def log(msg):
+    with print_lock:
+        print(f"\n{msg}", flush=True)
+
+
+def section(title):
+    print(f"\n{BOLD}{MAGENTA}== {title} =={RESET}", flush=True)
+
+
+def error_exit(msg):
+    log(f"{RED}error:{RESET} {msg}")
+    sys.exit(1)
+
+
+def run_pandoc(target: Target) -> bool:
+    """Run pandoc for a target, returning whether it succeeded"""
+    os.makedirs(os.path.dirname(target.output), exist_ok=True)
+    # Capture filter/pandoc diagnostics so parallel jobs don't interleave their lines
+    proc = subprocess.run(target.command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=target.env)
+    if proc.stderr:
+        with print_lock:
+            sys.stderr.write(proc.stderr)
+            sys.stderr.flush()
+    return proc.returncode == 0 and optimize.optimize_target(target)
+
+
+def remove_stale_outputs(targets, manifest: Manifest) -> int:
+    """Delete outputs (recorded or orphaned posts) that no longer have a source"""
+    current = {t.output for t in targets}
+    stale = [out for out in manifest.outputs if out not in current]
+    stale += [out for out in glob.glob('docs/posts/*.html') if out not in current and out not in stale]
+    for out in stale:
+        if os.path.exists(out):
+            os.remove(out)
+        manifest.forget(out)
+    return len(stale)
+
+
+def jobs_for(stale):
+    """
+    Group stale targets into units of work, each a list of targets.
+    All outputs of one filtered source are built from a single filtered AST.
+    """
+    groups = {}
+    for t in stale:
+        key = (t.source, t.filter) if t.filter else t.output
+        groups.setdefault(key, []).append(t)
+    return list(groups.values())
+
+
+def run_job(group, manifest: Manifest, in_process, force) -> dict:
+    """Build one unit of work, returning output path -> success"""
+    if group[0].filter:
+        return pipeline.build_group(group, manifest, in_process, force)
+    return {t.output: run_pandoc(t) for t in group}
+
+
+def build_outputs(manifest: Manifest, force=False, jobs=None, in_process=False, fingerprint=False, compress=False, optimize=False, reproducible_dates=False) -> List[Target]:
+    """Bring docs/ up to date with the sources, returning the targets that failed"""
+    targets = all_targets()
+    posts = [t for t in targets if not t.fatal]
+    if optimize:
+        for t in targets:
+            if t.output.endswith('.html'):
+                t.optimize = True
+                t.inputs += t.stylesheets
+    if reproducible_dates:
+        dates = reproducible.source_dates({t.output: t.inputs for t in targets})
+        for t in targets:
+            t.source_date_epoch = dates[t.output]
+
+    # Hash inputs up front in this thread; workers only run pandoc
+    keys = {t.output: manifest.key(t.inputs, t.recipe) for t in targets}
+    stale = [t for t in targets if force or manifest.is_stale(t.output, keys[t.output])]
+    jobs = jobs or os.cpu_count() or 1
+
+    failed = []
+    section("Build")
+    removed = remove_stale_outputs(targets, manifest)
+    if removed:
+        log(f"{YELLOW}clean:{RESET} removed {BOLD}{removed}{RESET} stale outputs")
+    log(f"{YELLOW}build:{RESET} {BOLD}{len(stale)}{RESET} of {len(targets)} outputs stale ({jobs} jobs)")
+
+    if in_process:
+        inprocess.preload(stale)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run_job, group, manifest, in_process, force): group for group in jobs_for(stale)}
+        for future in as_completed(futures):
+            results = future.result()
+            for target in futures[future]:
+                if results[target.output]:
+                    kept = not force and target.ast_key is not None and manifest.ast_current(target.output, target.ast_key)
+                    manifest.record(target.output, keys[target.output], target.inputs, target.ast_key)
+                    if kept:
+                        log(f"{YELLOW}build:{RESET} {target.output} unchanged (same filtered document)")
+                    elif target.fatal:
+                        log(f"{YELLOW}build:{RESET} {target.source} → {target.output}")
+                else:
+                    manifest.forget(target.output)
+                    failed.append(target)
+                    log(f"{RED}error:{RESET} Failed to build {os.path.basename(target.output)}")
+
+    built = sum(1 for t in stale if not t.fatal and t not in failed)
+    log(f"{YELLOW}build:{RESET} posts/*.md → docs/posts/*.html ({BOLD}{len(posts)}{RESET} posts, {BOLD}{built}{RESET} rebuilt)")
+    pruned = assets.prune_variants()
+    if pruned:
+        log(f"{YELLOW}clean:{RESET} removed {BOLD}{pruned}{RESET} unused image variants")
+
+    if fingerprint:
+        mapping = assets.fingerprint(manifest)
+        log(f"{YELLOW}assets:{RESET} fingerprinted {BOLD}{len(mapping)}{RESET} files in docs/style, docs/images")
+    if compress:
+        count = assets.compress()
+        formats = ".gz, .br" if assets.brotli else ".gz (install brotli for .br)"
+        log(f"{YELLOW}assets:{RESET} compressed {BOLD}{count}{RESET} changed files → {formats}")
+    return failed
+
+
+def build(force=False, jobs=None, in_process=False, fingerprint=False, compress=False, optimize=False, reproducible_dates=False):
+    manifest = Manifest()
+    try:
+        failed = build_outputs(manifest, force, jobs, in_process, fingerprint, compress, optimize, reproducible_dates)
+    finally:
+        manifest.save()
+
+    fatal = [t for t in failed if t.fatal]
+    if fatal:
+        error_exit("Failed to build " + ", ".join(os.path.basename(t.output) for t in fatal))
+
+    log(f"{BOLD}{GREEN}✓ complete{RESET}")
+    log("outputs: docs/index.html, docs/cv.html, docs/cv.pdf, docs/posts/*.html\n")
+
+
+def check_links(ttl_days=None):
+    """Check the external links of main.bib and the pages, reusing recent results"""
+    section("Checking links")
+    ttl = links.TTL if ttl_days is None else ttl_days * 24 * 3600
+    broken = links.run(ttl)
+    if broken:
+        error_exit(f"{broken} broken links")
+    log(f"{BOLD}{GREEN}✓ links ok{RESET}")
+
+
+def watch(jobs=None, port=8000):
+    """
+    Rebuild on every source change from one long-lived process and serve docs/.
+    Filters run in-process, so their imports and in-memory caches (parsed
+    bibliography, news metadata, formatted author lists) stay warm between rebuilds.
+    """
+    manifest = Manifest()
+    reloader = Reloader()
+    server = serve(port, reloader)
+    try:
+        build_outputs(manifest, jobs=jobs, in_process=True)
+        manifest.save()
+        watcher = make_watcher()
+        log(f"{CYAN}watch:{RESET} serving docs/ at {BOLD}http://127.0.0.1:{port}/{RESET} "
+            f"({type(watcher).__name__}; Ctrl-C to stop)")
+        while True:
+            changed = watcher.wait()
+            started = time.perf_counter()
+            log(f"{CYAN}watch:{RESET} changed {', '.join(changed)}")
+            if any(path.startswith('filters' + os.sep) for path in changed):
+                inprocess.reload()
+            try:
+                failed = build_outputs(manifest, jobs=jobs, in_process=True)
+            except Exception as e:
+                # e.g. a half-written front matter block; wait for the next save
+                log(f"{RED}error:{RESET} {e}")
+                continue
+            finally:
+                manifest.save()
+            reloader.notify()
+            status = f"{RED}{len(failed)} failed{RESET}" if failed else f"{GREEN}ok{RESET}"
+            log(f"{CYAN}watch:{RESET} rebuilt in {BOLD}{(time.perf_counter() - started) * 1000:.0f} ms{RESET} ({status})")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--force', action='store_true', help="rebuild every output regardless of the manifest")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of pandoc processes to run at once (default: number of cores)")
+    parser.add_argument('--in-process', action='store_true', help="run the pandoc filters inside this process over each document's JSON AST")
+    parser.add_argument('--trace', metavar='FILE', help="append per-step filter timings to FILE as Chrome trace events (JSON lines)")
+    parser.add_argument('--stream', action='store_true', help="run the CV filter one top-level block at a time, in bounded memory")
+    parser.add_argument('--optimize', action='store_true', help="minify the generated HTML and inline the CSS each page uses, deferring the rest")
+    parser.add_argument('--reproducible', action='store_true', help="date each output by its newest input (SOURCE_DATE_EPOCH) instead of the clock")
+    parser.add_argument('--fingerprint', action='store_true', help="copy docs/style and docs/images to content-hashed names and point the HTML at them")
+    parser.add_argument('--compress', action='store_true', help="write precompressed .gz/.br siblings for the text files in docs/")
+    parser.add_argument('--watch', action='store_true', help="keep running: rebuild on every change and serve docs/ with live reload")
+    parser.add_argument('--port', type=int, default=8000, help="port for the --watch server (default: 8000)")
+    parser.add_argument('--check-links', action='store_true', help="check the links of main.bib and the pages instead of building")
+    parser.add_argument('--link-ttl', type=float, metavar='DAYS', help="re-check links whose cached result is older than DAYS (default: 7)")
+    args = parser.parse_args()
+    if args.trace:
+        # Read by filters/tracing.py, both in pandoc's filter processes and in-process
+        os.environ['SITE_TRACE'] = os.path.abspath(args.trace)
+    if args.stream:
+        # Read by the filters that have a streaming mode (filters/streaming.py)
+        os.environ['SITE_STREAM'] = '1'
+    if args.check_links:
+        check_links(args.link_ttl)
+        return
+    if args.watch:
+        watch(jobs=args.jobs, port=args.port)
+        return
+    build(force=args.force, jobs=args.jobs, in_process=args.in_process, fingerprint=args.fingerprint, compress=args.compress, optimize=args.optimize, reproducible_dates=args.reproducible)
+
+
+if __name__ == '__main__':
+    main()
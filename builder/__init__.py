@@ -0,0 +1,13 @@
+"""
+Build support for the website: target definitions, dependency manifest and
+the post-processing stages driven by build.py.
+"""
+
+import os
+import sys
+
+# The filter scripts import their helpers as siblings (e.g. `from bibliography
+# import ...`), and the builder shares some of them (cache.py, bibliography.py)
+FILTER_DIR = os.path.abspath('filters')
+if FILTER_DIR not in sys.path:
+    sys.path.insert(0, FILTER_DIR)
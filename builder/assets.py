@@ -0,0 +1,147 @@
+"""
+Post-build asset stage for docs/.
+
+fingerprint() copies stylesheets and images to content-hashed names
+(style/main.css -> style/main.1a2b3c4d.css) and rewrites the references in the
+generated HTML, so they can be cached forever. compress() writes .gz and .br
+siblings for every text file. Both are incremental: unchanged files are not
+copied, rewritten or recompressed again. prune_variants() removes resized
+image variants (filters/images.py) that no generated page uses any more.
+"""
+
+import glob
+import gzip
+import os
+import pathlib
+import re
+from typing import Dict, List
+
+from builder.manifest import Manifest
+from cache import CACHE_DIR
+from images import VARIANTS_DIR
+
+try:
+    import brotli
+except ImportError:  # optional; .br siblings are skipped without it
+    brotli = None
+
+DOCS_DIR = 'docs'
+ASSET_DIRS = ['style', 'images']
+TEXT_EXTENSIONS = {'.html', '.css', '.js', '.json', '.svg', '.xml', '.txt'}
+ASSETS_MANIFEST = os.path.join(CACHE_DIR, 'assets.json')
+
+HASH_LENGTH = 8
+FINGERPRINTED_RE = re.compile(r'\.[0-9a-f]{%d}(\.[^./]+)$' % HASH_LENGTH)
+# href="style/main.css", src="../images/federico.jpg", also already fingerprinted names
+REFERENCE_RE = re.compile(r'''((?:href|src)=["'])((?:\.\./)*)((?:%s)/[^"'?#]+)(["'?#])''' % '|'.join(ASSET_DIRS))
+# images/resized/federico.4e88659c.320.jpeg, in src and srcset alike
+VARIANT_RE = re.compile(r'''%s/([^"'\s,?#]+)''' % re.escape(VARIANTS_DIR.replace(os.sep, '/')))
+
+
+def fingerprinted_name(path: str, digest: str) -> str:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def source_assets() -> List[str]:
+    """Asset files under docs/, excluding fingerprinted copies and compressed siblings"""
+    assets = []
+    for asset_dir in ASSET_DIRS:
+        for path in sorted(glob.glob(os.path.join(DOCS_DIR, asset_dir, '*'))):
+            if os.path.isfile(path) and not FINGERPRINTED_RE.search(path) and not path.endswith(('.gz', '.br')):
+                assets.append(path)
+    return assets
+
+
+def fingerprint(manifest: Manifest) -> Dict[str, str]:
+    """
+    Copy each asset to its content-hashed name and rewrite references in docs/**/*.html.
+
+    Args:
+        manifest: The build manifest, whose records for rewritten HTML outputs are
+            refreshed so the rewrite does not make them look stale
+
+    Returns:
+        Mapping of asset path relative to docs/ -> fingerprinted path relative to docs/
+    """
+    mapping = {}
+    for path in source_assets():
+        digest = manifest.file_hash(path)
+        target = fingerprinted_name(path, digest)
+        if not os.path.exists(target):
+            pathlib.Path(target).write_bytes(pathlib.Path(path).read_bytes())
+        mapping[os.path.relpath(path, DOCS_DIR)] = os.path.relpath(target, DOCS_DIR)
+
+    # Drop copies of older versions
+    current = set(mapping.values())
+    for asset_dir in ASSET_DIRS:
+        for path in glob.glob(os.path.join(DOCS_DIR, asset_dir, '*')):
+            if FINGERPRINTED_RE.search(path) and os.path.relpath(path, DOCS_DIR) not in current:
+                os.remove(path)
+
+    def replace(match):
+        prefix, up, ref, end = match.groups()
+        logical = FINGERPRINTED_RE.sub(r'\1', ref)
+        return f"{prefix}{up}{mapping.get(logical, ref)}{end}"
+
+    for html in glob.glob(os.path.join(DOCS_DIR, '**', '*.html'), recursive=True):
+        text = pathlib.Path(html).read_text(encoding='utf-8')
+        rewritten = REFERENCE_RE.sub(replace, text)
+        if rewritten != text:
+            pathlib.Path(html).write_text(rewritten, encoding='utf-8')
+            manifest.refresh(html)
+    return mapping
+
+
+def prune_variants() -> int:
+    """
+    Delete the resized image variants in docs/ that no generated page references.
+
+    Variant names carry the image's content hash, so every edit of an image
+    publishes new ones; the old ones are removed here once no page uses them.
+    Returns the number of files removed.
+    """
+    variants_dir = os.path.join(DOCS_DIR, VARIANTS_DIR)
+    if not os.path.isdir(variants_dir):
+        return 0
+    used = set()
+    for html in glob.glob(os.path.join(DOCS_DIR, '**', '*.html'), recursive=True):
+        used.update(VARIANT_RE.findall(pathlib.Path(html).read_text(encoding='utf-8')))
+    stale = [name for name in os.listdir(variants_dir) if name not in used]
+    for name in stale:
+        os.remove(os.path.join(variants_dir, name))
+    return len(stale)
+
+
+def compress(state: Manifest = None) -> int:
+    """
+    Write .gz (and .br, if brotli is installed) siblings for every text file in docs/.
+
+    A file is recompressed only when its content hash differs from the one its
+    siblings were made from. Returns the number of files compressed.
+    """
+    state = state or Manifest(ASSETS_MANIFEST)
+    count = 0
+    for path in sorted(glob.glob(os.path.join(DOCS_DIR, '**', '*'), recursive=True)):
+        if not os.path.isfile(path) or os.path.splitext(path)[1] not in TEXT_EXTENSIONS:
+            continue
+        digest = state.file_hash(path)
+        siblings = [path + '.gz'] + ([path + '.br'] if brotli else [])
+        if all(state.outputs.get(s, {}).get('key') == digest and os.path.exists(s) for s in siblings):
+            continue
+        data = pathlib.Path(path).read_bytes()
+        # mtime=0 keeps the .gz bytes identical for identical input
+        pathlib.Path(path + '.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli:
+            pathlib.Path(path + '.br').write_bytes(brotli.compress(data, quality=11))
+        for s in siblings:
+            state.outputs[s] = {'key': digest}
+        count += 1
+
+    # Siblings whose source is gone
+    for sibling in glob.glob(os.path.join(DOCS_DIR, '**', '*.gz'), recursive=True) + glob.glob(os.path.join(DOCS_DIR, '**', '*.br'), recursive=True):
+        if not os.path.exists(sibling[:-3]):
+            os.remove(sibling)
+            state.outputs.pop(sibling, None)
+    state.save()
+    return count
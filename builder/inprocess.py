@@ -0,0 +1,82 @@
+"""
+In-process filter execution.
+
+Instead of pandoc starting a fresh interpreter for every `--filter`, each source
+is read into a JSON AST once and filtered here with the already imported filter
+modules; builder/pipeline.py hands the filtered AST back to pandoc for every
+writer that needs it.
+"""
+
+import importlib
+import io
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+import panflute as pf
+
+from builder import FILTER_DIR
+from builder.targets import Target
+
+_modules: Dict[str, object] = {}
+
+
+def filter_module(path: str):
+    """Import (once) the filter module for a `filters/<name>.py` path"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    if name not in _modules:
+        _modules[name] = importlib.import_module(name)
+    return _modules[name]
+
+
+def reload():
+    """Forget the imported filter modules (and their in-memory caches) after filters/ changed"""
+    for name, module in list(sys.modules.items()):
+        if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or '')) == FILTER_DIR:
+            del sys.modules[name]
+    _modules.clear()
+
+
+def preload(targets: List[Target]):
+    """Import every filter module up front, before any worker thread needs one"""
+    for target in targets:
+        if target.filter:
+            filter_module(target.filter)
+
+
+def read_ast(source: str) -> str:
+    proc = subprocess.run(['pandoc', source, '-t', 'json'], capture_output=True, text=True, check=True)
+    return proc.stdout
+
+
+def filter_ast(ast: str, filter_path: str, format: str, env: Optional[dict] = None) -> str:
+    """
+    Run a filter module's main(doc) over a JSON AST and return the filtered JSON.
+    `env` is the environment the filter would run in under pandoc; its
+    SOURCE_DATE_EPOCH is handed to the filter as doc.source_date_epoch, since
+    os.environ is shared by the build's threads.
+    """
+    module = filter_module(filter_path)
+    if os.environ.get('SITE_STREAM') and hasattr(module, 'main_streaming'):
+        # Block by block, without building the whole document as panflute objects
+        out = io.StringIO()
+        module.main_streaming(io.StringIO(ast), out, format)
+        return out.getvalue()
+    doc = pf.load(io.StringIO(ast))
+    doc.format = format
+    if env and env.get('SOURCE_DATE_EPOCH'):
+        doc.source_date_epoch = env['SOURCE_DATE_EPOCH']
+    doc = module.main(doc)
+    out = io.StringIO()
+    pf.dump(doc, out)
+    return out.getvalue()
+
+
+def write_ast(ast: str, target: Target) -> bool:
+    command = ['pandoc', '-f', 'json', '-o', target.output, *target.writer_args]
+    proc = subprocess.run(command, input=ast, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=target.env)
+    if proc.stderr:
+        sys.stderr.write(proc.stderr)
+    return proc.returncode == 0
+
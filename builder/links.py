@@ -0,0 +1,281 @@
+"""
+Link checker for the external links the site publishes.
+
+Collects the `url` fields of main.bib (as the filters read them) and the http(s)
+links in posts/*.md, index.md and cv.md, and checks them concurrently with
+asyncio: a HEAD request (GET when a server refuses HEAD), following redirects,
+with a timeout on each request. Each host gets a small pool of keep-alive
+connections, so no host sees more than PER_HOST requests at once. Results are
+kept in .cache/links.json; links that worked (or that a server refused to
+answer for a bot) are not checked again until they are older than the TTL,
+broken ones are checked on every run.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import pathlib
+import re
+import ssl
+import sys
+import time
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+# From filters/, which builder/__init__.py puts on sys.path: main.bib is read as the filters read it
+import bibliography
+from cache import CACHE_DIR, write_text
+
+# Bump when the meaning of a cached result changes
+LINKS_VERSION = 1
+
+SOURCES = ['index.md', 'cv.md', 'posts/*.md']
+BIB_FILE = 'main.bib'
+
+TTL = 7 * 24 * 3600
+TIMEOUT = 10.0
+PER_HOST = 4
+TOTAL = 32
+MAX_REDIRECTS = 5
+USER_AGENT = 'Mozilla/5.0 (compatible; site-link-check)'
+
+# Statuses that say "not for bots", not "gone": reported, but not as broken
+BLOCKED = frozenset([401, 403, 429])
+# Servers that do not implement HEAD properly
+HEAD_REFUSED = frozenset([400, 403, 404, 405, 501])
+
+# [text](url), with balanced parentheses inside the url; <url>; href="url"
+LINK_RE = re.compile(
+    r'\]\((https?://(?:[^()\s]|\([^()\s]*\))+)'
+    r'|<(https?://[^>\s]+)>'
+    r'|href="(https?://[^"]+)"'
+)
+
+
+def collect(bib_file=BIB_FILE, sources=SOURCES) -> Dict[str, List[str]]:
+    """Every external link, mapped to where it appears (file, and paper title for the bib)"""
+    links = {}
+    if os.path.exists(bib_file):
+        for paper in bibliography.load_papers(bib_file):
+            if paper.link.startswith(('http://', 'https://')):
+                links.setdefault(paper.link, []).append(f"{bib_file}: {paper.title}")
+    for pattern in sources:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding='utf-8') as f:
+                for n, line in enumerate(f, 1):
+                    for m in LINK_RE.finditer(line):
+                        links.setdefault(next(g for g in m.groups() if g), []).append(f"{path}:{n}")
+    return links
+
+
+class Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class HostPool:
+    """At most `limit` connections to one host at a time, reused while the server keeps them alive"""
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.idle: List[Connection] = []
+
+    def close(self):
+        for conn in self.idle:
+            conn.close()
+        self.idle.clear()
+
+
+class Checker:
+    """Checks URLs over per-host connection pools; use within one event loop"""
+
+    def __init__(self, per_host=PER_HOST, total=TOTAL, timeout=TIMEOUT):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.total = asyncio.Semaphore(total)
+        self.pools: Dict[Tuple[str, str, int], HostPool] = {}
+        self.ssl = ssl.create_default_context()
+
+    def pool(self, key) -> HostPool:
+        if key not in self.pools:
+            self.pools[key] = HostPool(self.per_host)
+        return self.pools[key]
+
+    async def connect(self, scheme, host, port) -> Connection:
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=self.ssl if scheme == 'https' else None, limit=1 << 16)
+        return Connection(reader, writer)
+
+    async def exchange(self, conn: Connection, method, parts) -> Tuple[int, Dict[str, str], bool]:
+        """Send one request and read the status and headers; returns (status, headers, reusable)"""
+        target = urllib.parse.quote(parts.path or '/', safe="/%:@!$&'()*+,;=~-._")
+        if parts.query:
+            target += '?' + urllib.parse.quote(parts.query, safe="/%:@!$&'()*+,;=~-._?")
+        request = (
+            f"{method} {target} HTTP/1.1\r\n"
+            f"Host: {parts.netloc.rsplit('@', 1)[-1]}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Accept: */*\r\n"
+            "\r\n"
+        )
+        conn.writer.write(request.encode('ascii', 'replace'))
+        await conn.writer.drain()
+        head = await conn.reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        version, status = lines[0].split(' ', 2)[:2]
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        # Only a HEAD response is known to end with its headers; after a GET the body is not read
+        reusable = (method == 'HEAD' and version == 'HTTP/1.1'
+                    and headers.get('connection', '').lower() != 'close')
+        return int(status), headers, reusable
+
+    async def request(self, method, url) -> Tuple[int, Dict[str, str]]:
+        """One request; the timeout starts once a connection slot for the host is free"""
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        pool = self.pool((scheme, parts.hostname, port))
+        async with pool.semaphore, self.total:
+            return await asyncio.wait_for(self.send(pool, method, parts, scheme, port), self.timeout)
+
+    async def send(self, pool: HostPool, method, parts, scheme, port) -> Tuple[int, Dict[str, str]]:
+        for attempt in range(2):
+            # An idle connection may have been closed by the server meanwhile: retry on a fresh one
+            reused = bool(pool.idle)
+            conn = pool.idle.pop() if reused else await self.connect(scheme, parts.hostname, port)
+            try:
+                status, headers, reusable = await self.exchange(conn, method, parts)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if reusable:
+                pool.idle.append(conn)
+            else:
+                conn.close()
+            return status, headers
+
+    async def check(self, url) -> dict:
+        """Result for one URL: {'status', 'state' ('ok', 'blocked' or 'broken'), 'error', 'url' (final)}"""
+        try:
+            return await self.follow(url)
+        except asyncio.TimeoutError:
+            return {'status': None, 'state': 'broken', 'error': f"timed out after {self.timeout:g}s"}
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+            return {'status': None, 'state': 'broken', 'error': str(e) or type(e).__name__}
+
+    async def follow(self, url) -> dict:
+        current = url
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers = await self.request('HEAD', current)
+            if status in HEAD_REFUSED:
+                status, headers = await self.request('GET', current)
+            if 300 <= status < 400 and 'location' in headers:
+                current = urllib.parse.urljoin(current, headers['location'])
+                continue
+            state = 'ok' if status < 400 else 'blocked' if status in BLOCKED else 'broken'
+            result = {'status': status, 'state': state, 'error': None}
+            if current != url:
+                result['url'] = current
+            return result
+        return {'status': None, 'state': 'broken', 'error': f"more than {MAX_REDIRECTS} redirects"}
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+
+def cache_path() -> pathlib.Path:
+    return pathlib.Path(CACHE_DIR) / 'links.json'
+
+
+def read_cache() -> Dict[str, dict]:
+    try:
+        cached = json.loads(cache_path().read_text(encoding='utf-8'))
+        return cached['links'] if cached.get('version') == LINKS_VERSION else {}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def write_cache(results: Dict[str, dict]):
+    write_text(cache_path(), json.dumps({'version': LINKS_VERSION, 'links': results}, sort_keys=True))
+
+
+async def check_all(urls, per_host=PER_HOST, total=TOTAL, timeout=TIMEOUT) -> Dict[str, dict]:
+    checker = Checker(per_host, total, timeout)
+    try:
+        results = await asyncio.gather(*(checker.check(url) for url in urls))
+    finally:
+        checker.close()
+    return dict(zip(urls, results))
+
+
+def check_links(urls, ttl=TTL, now: Optional[float] = None, **limits) -> Tuple[Dict[str, dict], int]:
+    """
+    Check urls, reusing cached results younger than `ttl` seconds (except broken ones).
+
+    Args:
+        urls: The URLs to check
+        ttl: Maximum age of a reused result
+        now: Current time (for tests of the expiry)
+        limits: per_host, total and timeout for the Checker
+
+    Returns:
+        (url -> result with its 'checked' time, number of URLs actually requested)
+    """
+    now = time.time() if now is None else now
+    cached = read_cache()
+    results = {}
+    todo = []
+    for url in urls:
+        entry = cached.get(url)
+        if entry and entry['state'] != 'broken' and now - entry['checked'] < ttl:
+            results[url] = entry
+        else:
+            todo.append(url)
+    if todo:
+        for url, result in asyncio.run(check_all(todo, **limits)).items():
+            result['checked'] = now
+            results[url] = result
+    # Keep entries for links that are gone from the sources only until they expire
+    kept = {url: entry for url, entry in cached.items() if url not in results and now - entry['checked'] < ttl}
+    write_cache({**kept, **results})
+    return results, len(todo)
+
+
+def describe(result) -> str:
+    detail = result['error'] or f"HTTP {result['status']}"
+    return f"{detail} (via {result['url']})" if result.get('url') else detail
+
+
+def run(ttl=TTL, out=sys.stdout) -> int:
+    """Check every link of the site and print the problems; returns the number of broken links"""
+    links = collect()
+    start = time.perf_counter()
+    results, requested = check_links(list(links), ttl)
+    elapsed = time.perf_counter() - start
+    broken = 0
+    for url in sorted(links):
+        result = results[url]
+        if result['state'] == 'ok':
+            continue
+        broken += result['state'] == 'broken'
+        print(f"{result['state']}: {url} → {describe(result)}", file=out)
+        for place in links[url]:
+            print(f"    {place}", file=out)
+    print(f"{len(links)} links, {requested} checked in {elapsed:.1f}s "
+          f"({len(links) - requested} cached), {broken} broken", file=out)
+    return broken
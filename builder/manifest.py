@@ -0,0 +1,99 @@
+"""
+Dependency manifest for incremental builds.
+
+Every output records the hash of each input it was built from together with
+the command that built it. An output is rebuilt only when that key changes.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+from typing import Dict, Iterable, List, Optional
+
+from cache import CACHE_DIR, write_text
+
+MANIFEST_FILE = os.path.join(CACHE_DIR, 'manifest.json')
+
+
+class Manifest:
+    """On-disk record of the inputs each output was last built from"""
+
+    def __init__(self, path: str = MANIFEST_FILE):
+        self.path = pathlib.Path(path)
+        self.outputs: Dict[str, dict] = {}
+        # path -> [mtime_ns, size, sha256] so unchanged files are not re-read
+        self.files: Dict[str, list] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.outputs = data.get('outputs', {})
+            self.files = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+
+    def file_hash(self, path: str) -> Optional[str]:
+        """Content hash of a file, or None if it does not exist"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.files.pop(path, None)
+            return None
+        cached = self.files.get(path)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        digest = hashlib.sha256(pathlib.Path(path).read_bytes()).hexdigest()
+        self.files[path] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def key(self, inputs: Iterable[str], command: List[str]) -> str:
+        """Combined key over the input hashes and the command line"""
+        h = hashlib.sha256()
+        h.update("\0".join(command).encode())
+        for path in sorted(set(inputs)):
+            h.update(f"\0{path}\0{self.file_hash(path)}".encode())
+        return h.hexdigest()
+
+    def is_stale(self, output: str, key: str) -> bool:
+        """Stale if the key changed or the output was removed or touched since it was built"""
+        entry = self.outputs.get(output)
+        if entry is None or entry.get('key') != key:
+            return True
+        try:
+            st = os.stat(output)
+        except OSError:
+            return True
+        return entry.get('stat') != [st.st_mtime_ns, st.st_size]
+
+    def ast_current(self, output: str, ast_key: str) -> bool:
+        """Whether the output was last written from the same filtered AST and is untouched since"""
+        entry = self.outputs.get(output)
+        if entry is None or entry.get('ast') != ast_key:
+            return False
+        try:
+            st = os.stat(output)
+        except OSError:
+            return False
+        return entry.get('stat') == [st.st_mtime_ns, st.st_size]
+
+    def record(self, output: str, key: str, inputs: Iterable[str], ast_key: Optional[str] = None):
+        st = os.stat(output)
+        self.outputs[output] = {
+            'key': key,
+            'inputs': sorted(set(inputs)),
+            'stat': [st.st_mtime_ns, st.st_size],
+        }
+        if ast_key:
+            self.outputs[output]['ast'] = ast_key
+
+    def refresh(self, output: str):
+        """Re-stat an output that a post-build step rewrote, keeping its key"""
+        entry = self.outputs.get(output)
+        if entry is not None:
+            st = os.stat(output)
+            entry['stat'] = [st.st_mtime_ns, st.st_size]
+
+    def forget(self, output: str):
+        self.outputs.pop(output, None)
+
+    def save(self):
+        write_text(self.path, json.dumps({'outputs': self.outputs, 'files': self.files}, indent=1))
@@ -0,0 +1,336 @@
+"""
+Optimization stage for the generated HTML pages.
+
+After pandoc writes a page, its whitespace and comments are stripped (except
+inside <pre>, <code>, <textarea> and <script>) and its local stylesheets stop
+blocking the first render: the rules the page can use (judged by the tags,
+classes and ids it contains) are inlined into <head>, and a minified copy of
+each full stylesheet (style/main.min.css) is loaded without blocking. A
+stylesheet the page uses entirely is only inlined.
+
+The inlined CSS depends only on the stylesheets and on which of their tags,
+classes and ids a page contains, so it is cached under that key: pages from the
+same template (every post, say) share one entry and are not matched again.
+"""
+
+import hashlib
+import os
+import pathlib
+import re
+import sys
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from cache import CACHE_DIR, write_text
+
+# Bump when the output changes, so every optimized page is built again
+OPTIMIZE_VERSION = 1
+CRITICAL_DIR = os.path.join(CACHE_DIR, 'critical')
+
+# CSS strings and comments; comments are dropped, strings kept as they are
+CSS_TOKEN_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/''', re.DOTALL)
+CSS_SPACE_RE = re.compile(r'\s+')
+# Spaces that never matter next to these characters (not around + or ~, which calc() needs)
+CSS_PUNCT_RE = re.compile(r' ?([{};,>]) ?|: ')
+CSS_LAST_SEMI_RE = re.compile(r';}')
+
+# Selector parts that do not name what an element is: pseudo-classes/elements and attributes
+PSEUDO_RE = re.compile(r'::?[\w-]+(?:\([^)]*\))?|\[[^\]]*\]')
+COMBINATOR_RE = re.compile(r'[\s>+~]+')
+SIMPLE_RE = re.compile(r'([.#]?)(-?[_a-zA-Z][\w-]*|\*)')
+
+STYLESHEET_RE = re.compile(r'<link rel="stylesheet" href="([^"]+)"\s*/?>\s*')
+TAG_RE = re.compile(r'<([a-zA-Z][\w-]*)')
+CLASS_RE = re.compile(r'\sclass="([^"]*)"')
+ID_RE = re.compile(r'\sid="([^"]*)"')
+
+# Comments, elements whose content is kept verbatim, other tags; the rest is text
+HTML_TOKEN_RE = re.compile(
+    r'(<!--.*?-->)|(<(pre|code|textarea|script|style)\b[^>]*>.*?</\3\s*>)|(<[^>]+>)',
+    re.DOTALL | re.IGNORECASE,
+)
+HTML_SPACE_RE = re.compile(r'\s+')
+TAG_NAME_RE = re.compile(r'</?([a-zA-Z][\w-]*)')
+# Whitespace next to these tags never renders
+BLOCK_TAGS = frozenset('''
+    html head body meta link title style script base noscript div p ul ol li dl dt dd
+    table thead tbody tfoot tr td th caption colgroup col section article aside header
+    footer nav main h1 h2 h3 h4 h5 h6 hr br blockquote figure figcaption pre form
+    fieldset legend details summary picture source
+'''.split())
+
+_lock = threading.Lock()
+_critical: Dict[str, str] = {}
+_stylesheets: Dict[str, Tuple[str, str, list]] = {}
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and needless whitespace, leaving strings untouched"""
+    out = []
+    code = []
+    pos = 0
+    for m in CSS_TOKEN_RE.finditer(css):
+        code.append(css[pos:m.start()])
+        if m.group(1):
+            out += [minify_css_code(''.join(code)), m.group(1)]
+            code = []
+        else:
+            code.append(' ')
+        pos = m.end()
+    code.append(css[pos:])
+    out.append(minify_css_code(''.join(code)))
+    return ''.join(out).strip()
+
+
+def minify_css_code(code: str) -> str:
+    """Minify CSS outside strings"""
+    code = CSS_PUNCT_RE.sub(lambda m: m.group(1) or ':', CSS_SPACE_RE.sub(' ', code))
+    return CSS_LAST_SEMI_RE.sub('}', code)
+
+
+def parse_css(css: str) -> list:
+    """
+    Split minified CSS into rules: (prelude, body) with body a declaration string,
+    a list of nested rules (@media and friends) or None (@import and other statements).
+    """
+    rules, stack = [], []
+    start = 0
+    i = 0
+    while i < len(css):
+        c = css[i]
+        if c in '"\'':
+            i = CSS_TOKEN_RE.match(css, i).end()
+            continue
+        if c == ';' and css[start:i].lstrip().startswith('@'):
+            rules.append((css[start:i].strip(), None))
+            start = i + 1
+        elif c == '{':
+            prelude = css[start:i].strip()
+            if prelude.startswith('@') and not prelude.startswith(('@font-face', '@page')):
+                stack.append((prelude, rules))
+                rules = []
+                start = i + 1
+            else:
+                end = css.index('}', i)
+                rules.append((prelude, css[i + 1:end]))
+                i = end
+                start = i + 1
+        elif c == '}' and stack:
+            prelude, outer = stack.pop()
+            outer.append((prelude, rules))
+            rules = outer
+            start = i + 1
+        i += 1
+    return rules
+
+
+def serialize(rules) -> str:
+    parts = []
+    for prelude, body in rules:
+        if body is None:
+            parts.append(prelude + ';')
+        elif isinstance(body, list):
+            parts.append(prelude + '{' + serialize(body) + '}')
+        else:
+            parts.append(prelude + '{' + body + '}')
+    return ''.join(parts)
+
+
+def selector_names(selector: str) -> List[Tuple[str, str]]:
+    """(kind, name) pairs a selector requires, kind '' for a tag, '.' for a class, '#' for an id"""
+    names = []
+    for compound in COMBINATOR_RE.split(PSEUDO_RE.sub('', selector)):
+        names += [(kind, name) for kind, name in SIMPLE_RE.findall(compound) if name != '*']
+    return names
+
+
+def used(rules, names: FrozenSet[Tuple[str, str]]) -> list:
+    """The rules that can apply to a page with these names, for the first render on screen"""
+    kept = []
+    for prelude, body in rules:
+        if body is None:
+            # @import blocks the render; the deferred stylesheet brings it
+            continue
+        if isinstance(body, list):
+            if prelude.startswith('@media') and 'print' in prelude and 'screen' not in prelude:
+                continue
+            if prelude.startswith(('@media', '@supports')):
+                inner = used(body, names)
+                if inner:
+                    kept.append((prelude, inner))
+            continue
+        if prelude.startswith('@'):
+            continue
+        selectors = [s for s in prelude.split(',') if all(n in names for n in selector_names(s))]
+        if selectors:
+            kept.append((','.join(selectors), body))
+    return kept
+
+
+def page_names(html: str) -> FrozenSet[Tuple[str, str]]:
+    names = {('', tag.lower()) for tag in TAG_RE.findall(html)}
+    for classes in CLASS_RE.findall(html):
+        names.update(('.', c) for c in classes.split())
+    names.update(('#', i) for i in ID_RE.findall(html))
+    return frozenset(names)
+
+
+def stylesheet(path: str) -> Tuple[str, str, list]:
+    """(hash, minified text, parsed rules) of a stylesheet, parsed once per content"""
+    data = pathlib.Path(path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    with _lock:
+        cached = _stylesheets.get(path)
+        if cached and cached[0] == digest:
+            return cached
+    css = minify_css(data.decode('utf-8'))
+    entry = (digest, css, parse_css(css))
+    with _lock:
+        _stylesheets[path] = entry
+    return entry
+
+
+def mentioned(rules) -> FrozenSet[Tuple[str, str]]:
+    """Every name the selectors of these rules require"""
+    names = set()
+    for prelude, body in rules:
+        if isinstance(body, list):
+            names |= mentioned(body)
+        elif body is not None:
+            for selector in prelude.split(','):
+                names.update(selector_names(selector))
+    return frozenset(names)
+
+
+def critical_css(path: str, names: FrozenSet[Tuple[str, str]]) -> str:
+    """
+    The rules of one stylesheet a page with `names` can use, cached by the
+    stylesheet's hash and the names it mentions that the page has.
+    """
+    digest, _, rules = stylesheet(path)
+    relevant = sorted(names & mentioned(rules))
+    key = hashlib.sha256(f"v{OPTIMIZE_VERSION}\0{digest}\0{relevant}".encode()).hexdigest()[:16]
+    with _lock:
+        if key in _critical:
+            return _critical[key]
+    cache_file = pathlib.Path(CRITICAL_DIR) / f"{key}.css"
+    try:
+        css = cache_file.read_text(encoding='utf-8')
+    except OSError:
+        css = serialize(used(rules, frozenset(relevant)))
+        write_text(cache_file, css)
+    with _lock:
+        _critical[key] = css
+    return css
+
+
+def minified_path(path: str) -> str:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.min{ext}"
+
+
+def write_minified(path: str) -> str:
+    """Write style/x.min.css next to style/x.css unless it is already current; returns its path"""
+    _, css, _ = stylesheet(path)
+    target = minified_path(path)
+    with _lock:
+        try:
+            if pathlib.Path(target).read_text(encoding='utf-8') == css:
+                return target
+        except OSError:
+            pass
+        write_text(target, css)
+    return target
+
+
+def deferred(href: str) -> str:
+    return (f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+
+def inline_stylesheets(html: str, page: str) -> str:
+    """Replace the page's local stylesheet links with its critical CSS and deferred minified copies"""
+    links = [m for m in STYLESHEET_RE.finditer(html) if '://' not in m.group(1)]
+    if not links:
+        return html
+    names = page_names(html)
+    critical, loads = [], []
+    for m in links:
+        href = m.group(1)
+        path = os.path.normpath(os.path.join(os.path.dirname(page), href))
+        css = critical_css(path, names)
+        critical.append(css)
+        if css != stylesheet(path)[1]:
+            write_minified(path)
+            loads.append(deferred(minified_path(href)))
+    block = f'<style data-critical>{"".join(critical)}</style>' + ''.join(loads)
+    out, pos = [], 0
+    for i, m in enumerate(links):
+        out.append(html[pos:m.start()])
+        if i == 0:
+            out.append(block)
+        pos = m.end()
+    out.append(html[pos:])
+    return ''.join(out)
+
+
+def tag_name(tag: Optional[str]) -> Optional[str]:
+    m = TAG_NAME_RE.match(tag) if tag else None
+    return m.group(1).lower() if m else None
+
+
+def minify_html(html: str) -> str:
+    """Collapse whitespace and drop comments outside the elements whose content is kept verbatim"""
+    tokens = []
+    pos = 0
+    for m in HTML_TOKEN_RE.finditer(html):
+        if m.start() > pos:
+            tokens.append(('text', html[pos:m.start()]))
+        if m.group(1):
+            pass
+        elif m.group(2):
+            raw = m.group(2)
+            if m.group(3).lower() == 'style':
+                open_end = raw.index('>') + 1
+                close = raw.rindex('</')
+                raw = raw[:open_end] + minify_css(raw[open_end:close]) + raw[close:]
+            tokens.append(('tag', raw))
+        else:
+            tokens.append(('tag', m.group(4)))
+        pos = m.end()
+    if pos < len(html):
+        tokens.append(('text', html[pos:]))
+
+    out = []
+    for i, (kind, text) in enumerate(tokens):
+        if kind == 'tag':
+            out.append(text)
+            continue
+        text = HTML_SPACE_RE.sub(' ', text)
+        before = tag_name(tokens[i - 1][1]) if i > 0 and tokens[i - 1][0] == 'tag' else None
+        after = tag_name(tokens[i + 1][1]) if i + 1 < len(tokens) and tokens[i + 1][0] == 'tag' else None
+        if i == 0 or before in BLOCK_TAGS or (before is None and tokens[i - 1][1].startswith('<!')):
+            text = text.lstrip()
+        if i == len(tokens) - 1 or after in BLOCK_TAGS:
+            text = text.rstrip()
+        out.append(text)
+    return ''.join(out) + '\n'
+
+
+def optimize_page(path: str):
+    """Inline critical CSS into a generated page and minify it, in place"""
+    html = pathlib.Path(path).read_text(encoding='utf-8')
+    html = minify_html(inline_stylesheets(html, path))
+    write_text(path, html)
+
+
+def optimize_target(target) -> bool:
+    """Optimize a target's freshly written output if the build asked for it; returns success"""
+    if not target.optimize:
+        return True
+    try:
+        optimize_page(target.output)
+        return True
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"{target.output}: optimization failed: {e}\n")
+        return False
@@ -0,0 +1,79 @@
+"""
+Filtered documents: filter once, write every output, skip unchanged writers.
+
+Every output of a filtered source (e.g. the CV's HTML and PDF) is written from
+one filtered JSON AST. Each output also records an AST key: the hash of that
+AST, its writer arguments (template, `-V` variables) and the files they name.
+When a rebuild produces the same key, e.g. because only a bib field the CV
+does not show changed, the writer (xelatex for the PDF) is not run again and
+the existing output is kept.
+"""
+
+import hashlib
+import os
+import pathlib
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+from builder import inprocess, optimize
+from builder.manifest import Manifest
+from builder.targets import Target, header_inputs
+
+
+def filtered_ast(source: str, filter_path: str, in_process: bool, format: str, env: Optional[dict] = None) -> str:
+    """The source's JSON AST after its filter, run in this process or by pandoc"""
+    if in_process:
+        return inprocess.filter_ast(inprocess.read_ast(source), filter_path, format, env)
+    command = ['pandoc', source, '-t', 'json', f'--filter={filter_path}']
+    proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+    if proc.stderr:
+        sys.stderr.write(proc.stderr)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{filter_path} failed")
+    return proc.stdout
+
+
+def ast_key(ast: str, target: Target) -> str:
+    """Hash of everything the writer sees: the filtered AST, its arguments and the files they name"""
+    h = hashlib.sha256(ast.encode())
+    h.update("\0".join(target.writer_args).encode())
+    # Build options that change the output's bytes (optimization, source date)
+    h.update("\0".join(target.recipe[len(target.command):]).encode())
+    paths = header_inputs(target.args)
+    if target.optimize:
+        # The optimized page also depends on the stylesheets it inlines
+        paths += target.stylesheets
+    for path in paths:
+        h.update(f"\0{path}\0".encode() + pathlib.Path(path).read_bytes())
+    return h.hexdigest()
+
+
+def build_group(targets: List[Target], manifest: Manifest, in_process: bool, force: bool = False) -> Dict[str, bool]:
+    """
+    Build targets that share a source and filter from one filtered AST.
+    Sets each target's ast_key; outputs whose key is unchanged are left as they
+    are unless `force` is set.
+
+    Returns:
+        Mapping of output path -> whether that output is up to date
+    """
+    first = targets[0]
+    os.makedirs(os.path.dirname(first.output), exist_ok=True)
+    try:
+        html = any(t.output.endswith('.html') for t in targets)
+        # Outputs of one source may differ in source date; the filter sees the newest
+        newest = max(targets, key=lambda t: t.source_date_epoch or 0)
+        ast = filtered_ast(first.source, first.filter, in_process, 'html' if html else 'latex', newest.env)
+    except Exception as e:
+        sys.stderr.write(f"{first.source}: {e}\n")
+        return {t.output: False for t in targets}
+
+    results = {}
+    for target in targets:
+        target.ast_key = ast_key(ast, target)
+        if not force and manifest.ast_current(target.output, target.ast_key):
+            results[target.output] = True
+        else:
+            results[target.output] = inprocess.write_ast(ast, target) and optimize.optimize_target(target)
+    return results
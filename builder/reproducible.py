@@ -0,0 +1,71 @@
+"""
+Source dates for reproducible builds.
+
+Each output gets a SOURCE_DATE_EPOCH: the newest last-modified time among its
+inputs, where a file committed without local changes counts with the time of
+the last commit that touched it and any other file with its mtime. pandoc, the
+filters (the index footer's "Last updated") and xelatex (the PDF's dates) use
+it instead of the clock, so rebuilding unchanged sources gives identical bytes.
+A SOURCE_DATE_EPOCH already set in the environment applies to every output.
+"""
+
+import os
+import subprocess
+from typing import Dict, Iterable, List, Optional
+
+ENV = 'SOURCE_DATE_EPOCH'
+
+
+def git(*args) -> Optional[str]:
+    try:
+        proc = subprocess.run(['git', *args], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout
+
+
+def commit_times(paths: Iterable[str]) -> Dict[str, int]:
+    """Last commit time of each path that is committed and unchanged, from one walk of the history"""
+    paths = sorted(set(paths))
+    if not paths:
+        return {}
+    # Modified, staged or untracked files are newer than their last commit
+    status = git('status', '--porcelain', '-z', '--untracked-files=all', '--', *paths)
+    log = git('log', '--format=%x00%ct', '--name-only', '--', *paths)
+    if status is None or log is None:
+        return {}
+    changed = {entry[3:] for entry in status.split('\0') if len(entry) > 3}
+
+    wanted = set(paths) - changed
+    times = {}
+    for commit in log.split('\0')[1:]:
+        lines = commit.strip().splitlines()
+        if not lines:
+            continue
+        when = int(lines[0])
+        for path in lines[1:]:
+            # Newest commits come first: keep the first time a path shows up
+            if path in wanted and path not in times:
+                times[path] = when
+    return times
+
+
+def source_dates(inputs: Dict[str, List[str]]) -> Dict[str, int]:
+    """
+    SOURCE_DATE_EPOCH for each output.
+
+    Args:
+        inputs: Output path -> the files it is built from
+
+    Returns:
+        Output path -> newest time among its inputs, in seconds since the epoch
+    """
+    fixed = os.environ.get(ENV)
+    if fixed:
+        return {output: int(fixed) for output in inputs}
+    committed = commit_times(path for paths in inputs.values() for path in paths)
+    dates = {}
+    for output, paths in inputs.items():
+        times = [committed[p] if p in committed else int(os.stat(p).st_mtime) for p in paths if os.path.exists(p)]
+        dates[output] = max(times, default=0)
+    return dates
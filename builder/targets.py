@@ -0,0 +1,207 @@
+"""
+Build targets for the website: one per generated file under docs/.
+Each target knows the pandoc command that produces it and every file it reads.
+"""
+
+import glob
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import yaml
+
+from builder.optimize import OPTIMIZE_VERSION
+
+FILTER_MODULES = sorted(glob.glob('filters/*.py'))
+# Local images in markdown: ![alt](path ...)
+IMAGE_RE = re.compile(r'!\[[^\]]*\]\(([^)\s]+)')
+
+
+@dataclass
+class Target:
+    name: str                 # short label used in logs
+    source: str               # markdown source
+    output: str               # generated file under docs/
+    args: List[str]           # pandoc arguments after source and -o output
+    inputs: List[str] = field(default_factory=list)
+    fatal: bool = True        # abort the build if this target fails
+    filter: Optional[str] = None
+    ast_key: Optional[str] = None   # set by the build: hash of the filtered AST and writer arguments
+    optimize: bool = False          # set by the build: minify and inline critical CSS (builder/optimize.py)
+    source_date_epoch: Optional[int] = None   # set by reproducible builds (builder/reproducible.py)
+
+    @property
+    def command(self) -> List[str]:
+        return ['pandoc', self.source, '-o', self.output, *self.args]
+
+    @property
+    def writer_args(self) -> List[str]:
+        """Arguments for writing this output from an already filtered JSON AST"""
+        return [arg for arg in self.args if not arg.startswith('--filter=')]
+
+    @property
+    def stylesheets(self) -> List[str]:
+        """Local stylesheets the output links to, as paths relative to the repository"""
+        hrefs = [arg[len('--css='):] for arg in self.args if arg.startswith('--css=')]
+        return [os.path.normpath(os.path.join(os.path.dirname(self.output), h)) for h in hrefs if '://' not in h]
+
+    @property
+    def recipe(self) -> List[str]:
+        """What the output is made by: the pandoc command plus the build options that change its bytes"""
+        recipe = list(self.command)
+        if self.optimize:
+            recipe.append(f'+optimize={OPTIMIZE_VERSION}')
+        if self.source_date_epoch is not None:
+            recipe.append(f'+source-date-epoch={self.source_date_epoch}')
+        return recipe
+
+    @property
+    def env(self) -> Optional[dict]:
+        """Environment for pandoc and the tools it runs, or None to inherit this one"""
+        if self.source_date_epoch is None:
+            return None
+        # FORCE_SOURCE_DATE makes TeX's \today and the PDF dates follow SOURCE_DATE_EPOCH
+        return {**os.environ, 'SOURCE_DATE_EPOCH': str(self.source_date_epoch), 'FORCE_SOURCE_DATE': '1'}
+
+
+def front_matter(path: str) -> dict:
+    """Parse the YAML metadata block at the top of a markdown file"""
+    with open(path, encoding='utf-8') as f:
+        if f.readline().strip() != '---':
+            return {}
+        lines = []
+        for line in f:
+            if line.strip() in ('---', '...'):
+                break
+            lines.append(line)
+    return yaml.safe_load(''.join(lines)) or {}
+
+
+def data_inputs(source: str) -> List[str]:
+    """Files read by the filters on behalf of a document (bibliography, news posts)"""
+    meta = front_matter(source)
+    inputs = []
+    if meta.get('papers'):
+        inputs.append(meta['papers'])
+    if meta.get('news'):
+        inputs += sorted(glob.glob(os.path.join(meta['news'], '*.md')))
+    if meta.get('publications-shards') or meta.get('publication-pages'):
+        # The full-list fallback page and the publication pages use the post template
+        inputs.append('templates/post.html')
+    if meta.get('search'):
+        inputs.append('templates/search.html')
+    if meta.get('headshot'):
+        # Resized into variants by filters/images.py
+        inputs.append(os.path.join('docs', meta['headshot']))
+    return inputs
+
+
+def image_inputs(source: str, page_dir: str) -> List[str]:
+    """Local images a markdown file shows, as paths relative to the repository"""
+    with open(source, encoding='utf-8') as f:
+        urls = IMAGE_RE.findall(f.read())
+    paths = [os.path.normpath(os.path.join(page_dir, url)) for url in urls if '://' not in url]
+    return [path for path in paths if os.path.isfile(path)]
+
+
+def header_inputs(args: List[str]) -> List[str]:
+    """Template and --include-in-header snippets named in pandoc arguments"""
+    inputs = []
+    for arg in args:
+        for flag in ('--template=', '--include-in-header='):
+            if arg.startswith(flag):
+                inputs.append(arg[len(flag):])
+    return inputs
+
+
+def filtered(target: Target) -> Target:
+    """Add the filter and everything it reads to a target's inputs"""
+    target.args.append(f'--filter={target.filter}')
+    target.inputs += FILTER_MODULES + data_inputs(target.source)
+    return target
+
+
+def index_target() -> Target:
+    return filtered(Target(
+        name='index',
+        source='index.md',
+        output='docs/index.html',
+        args=[
+            '--standalone',
+            '--template=templates/index.html',
+            '--css=style/main.css',
+            '--css=style/index.css',
+            '--include-in-header=templates/scroller.html',
+            '--include-in-header=templates/selected.html',
+        ],
+        filter='filters/index.py',
+    ))
+
+
+def cv_html_target() -> Target:
+    return filtered(Target(
+        name='cv.html',
+        source='cv.md',
+        output='docs/cv.html',
+        args=[
+            '--standalone',
+            '--template=templates/cv.html',
+            '--css=style/main.css',
+            '--css=style/cv.css',
+            '--include-in-header=templates/scroller.html',
+        ],
+        filter='filters/cv.py',
+    ))
+
+
+def cv_pdf_target() -> Target:
+    return filtered(Target(
+        name='cv.pdf',
+        source='cv.md',
+        output='docs/cv.pdf',
+        args=[
+            '--template=templates/cv.latex',
+            '--pdf-engine=xelatex',
+            '-V', 'table-use-row-colors=false',
+        ],
+        filter='filters/cv.py',
+    ))
+
+
+def post_target(source: str) -> Target:
+    name = os.path.splitext(os.path.basename(source))[0]
+    target = Target(
+        name=name,
+        source=source,
+        output=f'docs/posts/{name}.html',
+        args=[
+            '--standalone',
+            '--template=templates/post.html',
+            '--css=../style/main.css',
+            '--css=../style/post.css',
+            '--include-in-header=templates/scroller.html',
+        ],
+        fatal=False,
+    )
+    # Only posts with local images need the filter (and its extra pandoc pass)
+    images = image_inputs(source, 'docs/posts')
+    if images:
+        target.filter = 'filters/post.py'
+        filtered(target).inputs += images
+    return target
+
+
+def post_targets() -> List[Target]:
+    return [post_target(f) for f in sorted(glob.glob('posts/*.md'))]
+
+
+def page_targets() -> List[Target]:
+    return [index_target(), cv_html_target(), cv_pdf_target()]
+
+
+def all_targets() -> List[Target]:
+    targets = page_targets() + post_targets()
+    for target in targets:
+        target.inputs = [target.source] + header_inputs(target.args) + target.inputs
+    return targets
@@ -0,0 +1,210 @@
+"""
+Watch mode support: file watching and a live-reloading static server.
+
+Watcher reports changes to the site's sources using inotify where the C
+library has it and falls back to polling file stats elsewhere. serve() runs a
+static server for docs/ that injects a small script into every page; the
+script reloads the page whenever Reloader.notify() is called after a rebuild.
+"""
+
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import struct
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Set
+
+WATCH_DIRS = ['posts', 'templates', 'filters']
+WATCH_FILES = ['index.md', 'cv.md', 'main.bib']
+# Collect the burst of events a single save produces (write, rename, chmod)
+DEBOUNCE = 0.02
+POLL_INTERVAL = 0.1
+
+RELOAD_PATH = '/__reload'
+RELOAD_SCRIPT = f'<script>new EventSource("{RELOAD_PATH}").onmessage = function () {{ location.reload(); }};</script>'
+
+
+def relevant(path: str) -> bool:
+    """Whether a changed path is a source file (not an editor swap file, temp file or directory)"""
+    path = os.path.normpath(path)
+    name = os.path.basename(path)
+    if path in WATCH_FILES:
+        return True
+    if os.path.dirname(path) not in WATCH_DIRS:
+        return False
+    return not (name.startswith(('.', '#')) or name.endswith(('~', '.tmp', '.swp', '.pyc')) or os.path.isdir(path))
+
+
+class PollingWatcher:
+    """Detects changes by comparing (mtime, size) snapshots of the watched files"""
+
+    def __init__(self):
+        self.snapshot = self.scan()
+
+    @staticmethod
+    def scan() -> Dict[str, tuple]:
+        paths = list(WATCH_FILES)
+        for directory in WATCH_DIRS:
+            if os.path.isdir(directory):
+                paths += [os.path.join(directory, name) for name in os.listdir(directory)]
+        stats = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats[path] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def wait(self) -> List[str]:
+        """Block until a watched file is created, changed or removed; return the changed paths"""
+        while True:
+            time.sleep(POLL_INTERVAL)
+            current = self.scan()
+            changed = {p for p in current.keys() | self.snapshot.keys() if current.get(p) != self.snapshot.get(p)}
+            self.snapshot = current
+            changed = sorted(p for p in changed if relevant(p))
+            if changed:
+                return changed
+
+
+class InotifyWatcher:
+    """Linux inotify watches on the source directories (and the repository root, for its files)"""
+
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        # AttributeError here (no inotify in this libc) selects the polling watcher
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        for directory in ['.'] + WATCH_DIRS:
+            wd = libc.inotify_add_watch(self.fd, directory.encode(), self.MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+            self.dirs[wd] = directory
+
+    def read(self, timeout) -> Set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if wd in self.dirs and name:
+                paths.add(os.path.normpath(os.path.join(self.dirs[wd], name)))
+        return paths
+
+    def wait(self) -> List[str]:
+        """Block until a watched file is created, changed or removed; return the changed paths"""
+        while True:
+            changed = self.read(None)
+            while True:
+                more = self.read(DEBOUNCE)
+                if not more:
+                    break
+                changed |= more
+            changed = sorted(p for p in changed if relevant(p))
+            if changed:
+                return changed
+
+
+def make_watcher():
+    """An inotify watcher if available, otherwise a polling one"""
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher()
+
+
+class Reloader:
+    """Build generation counter that connected pages wait on"""
+
+    def __init__(self):
+        self.generation = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    """Serves docs/, adding the reload script to HTML pages and the event stream it listens to"""
+
+    def __init__(self, *args, reloader: Reloader, **kwargs):
+        self.reloader = reloader
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            return self.send_events()
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split('?')[0].endswith('/'):
+            path = os.path.join(path, 'index.html')
+        if path.endswith('.html') and os.path.isfile(path):
+            return self.send_page(path)
+        return super().do_GET()
+
+    def send_page(self, path):
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        at = html.rfind('</body>')
+        html = html[:at] + RELOAD_SCRIPT + html[at:] if at >= 0 else html + RELOAD_SCRIPT
+        body = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        generation = self.reloader.generation
+        try:
+            while True:
+                current = self.reloader.wait(generation, timeout=15)
+                # A comment line keeps idle connections open
+                self.wfile.write(b'data: reload\n\n' if current != generation else b': ping\n\n')
+                self.wfile.flush()
+                generation = current
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, reloader: Reloader, directory: str = 'docs') -> ThreadingHTTPServer:
+    """Start the live-reloading server for `directory` on a background thread"""
+    handler = functools.partial(LiveReloadHandler, reloader=reloader, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,211 @@
+"""
+Shared bibliography loading for the index and CV filters.
+Normalized paper records are cached on disk so warm builds skip pybtex.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import sys
+from typing import FrozenSet, List, Tuple
+
+import panflute as pf
+
+import bibtex
+import tracing
+from cache import CACHE_DIR, write_text
+
+# Bump when the shape of a cached record changes
+CACHE_VERSION = 2
+
+# Records already loaded by this process (bib path -> (key, papers)), shared by
+# every filter run when the filters execute in-process
+_loaded = {}
+
+
+class Paper:
+    """One bibliography entry, reduced to the fields the filters use"""
+
+    __slots__ = ('title', 'venue', 'year', 'selected', 'link', 'authors')
+
+    def __init__(self, title: str, venue: str, year: str, selected: bool, link: str, authors: Tuple[str, ...]):
+        self.title = title
+        self.venue = venue
+        self.year = year
+        self.selected = selected
+        self.link = link
+        # Co-authors repeat across hundreds of entries; share one string per name
+        self.authors = tuple(sys.intern(name) for name in authors)
+
+    def to_row(self) -> list:
+        return [self.title, self.venue, self.year, self.selected, self.link, list(self.authors)]
+
+    @classmethod
+    def from_row(cls, row) -> 'Paper':
+        return cls(*row)
+
+
+@functools.lru_cache(maxsize=None)
+def author_runs(author_names: Tuple[str, ...], students: FrozenSet[str] = frozenset()) -> Tuple[Tuple[str, bool], ...]:
+    """
+    Format an author list as runs of (text, bold), memoized across entries.
+
+    Names are joined as "A", "A and B" or "A, B, and C". Adjacent non-student
+    names and separators are merged into one run, so an author list becomes a
+    handful of inline elements instead of two per author. Student names are
+    their own bold runs.
+    """
+    runs = []
+    text = ""
+    for i, name in enumerate(author_names):
+        if name in students:
+            if text:
+                runs.append((text, False))
+                text = ""
+            runs.append((name, True))
+        else:
+            text += name
+        if i < len(author_names) - 2:
+            text += ", "
+        elif i == len(author_names) - 2:
+            text += ", and " if len(author_names) > 2 else " and "
+    if text:
+        runs.append((text, False))
+    return tuple(runs)
+
+
+def author_elements(runs) -> list:
+    """Turn author runs into fresh panflute elements (Str, or Strong(Str) for bold runs)"""
+    return [pf.Strong(pf.Str(text)) if bold else pf.Str(text) for text, bold in runs]
+
+
+def clean_venue(text: str) -> str:
+    """
+    "Annual Conference on Neural Information Processing Systems (NeurIPS)" -> "NeurIPS"
+    "International Conference on Computer-Aided Verification (CAV)" -> "CAV"
+    """
+    return text.split("(")[-1].strip(")")
+
+
+def person_name(person) -> str:
+    """pybtex Person -> "First Last" (or just "Last" if there are no first names)"""
+    first = " ".join(person.first_names)
+    last = " ".join(person.last_names)
+    return f"{first} {last}" if first else last
+
+
+def paper_from_fields(key, fields, authors: List[str]) -> Paper:
+    """Build a record from an entry's fields (case-insensitive for pybtex) and "First Last" author names"""
+    selected = fields['selected'].lower() == 'true' if 'selected' in fields else False
+    link = fields["url"] if 'url' in fields else ""
+
+    if "booktitle" in fields:
+        venue = clean_venue(fields['booktitle'])
+    elif "journal" in fields:
+        venue = clean_venue(fields['journal'])
+    else:
+        assert False, f"Missing 'booktitle' or 'journal' metadata in {key}"
+
+    assert 'year' in fields, f"Missing 'year' metadata in {key}"
+    year = fields['year']
+    assert 'title' in fields, f"Missing 'title' metadata in {key}"
+    title = fields['title']
+
+    return Paper(title, venue, year, selected, link, authors)
+
+
+def parse_papers(bib_file) -> List[Paper]:
+    """
+    Parse a bibtex file into normalized paper records.
+    The streaming reader in bibtex.py handles the common subset; files it cannot
+    read are parsed with pybtex.
+    """
+    try:
+        return [paper_from_fields(key, fields, authors) for key, fields, authors in bibtex.read(bib_file)]
+    except bibtex.Unsupported as e:
+        pf.debug(f"  bib → {e}; parsing with pybtex")
+    return parse_papers_pybtex(bib_file)
+
+
+def parse_papers_pybtex(bib_file) -> List[Paper]:
+    """Parse a bibtex file with pybtex into normalized paper records"""
+    from pybtex.database import parse_file
+
+    papers = []
+    for pub in parse_file(bib_file).entries.values():
+        authors = [person_name(p) for p in pub.persons.get('author', [])]
+        papers.append(paper_from_fields(pub.key, pub.fields, authors))
+    return papers
+
+
+def cache_key(data: bytes) -> str:
+    """Content hash of the bib file plus the version of this module and the reader"""
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}\0".encode())
+    h.update(pathlib.Path(__file__).read_bytes())
+    h.update(pathlib.Path(bibtex.__file__).read_bytes())
+    h.update(b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+def cache_path(bib_file) -> pathlib.Path:
+    name = hashlib.sha256(os.path.abspath(bib_file).encode()).hexdigest()[:16]
+    return pathlib.Path(CACHE_DIR) / 'papers' / f"{name}.json"
+
+
+def load_papers(bib_file) -> List[Paper]:
+    """
+    Load normalized paper records for a bibtex file.
+
+    Records are reused from this process or read from the on-disk cache when the
+    bib file's content hash and the filter version match, otherwise the file is
+    parsed and the cache rewritten.
+
+    Args:
+        bib_file: Path to the bibtex file (missing or empty means no papers)
+
+    Returns:
+        List of Paper records in file order
+    """
+    if not bib_file or not os.path.exists(bib_file):
+        return []
+
+    with tracing.span('bib', file=bib_file) as span:
+        key = cache_key(pathlib.Path(bib_file).read_bytes())
+        if bib_file in _loaded and _loaded[bib_file][0] == key:
+            span.args['source'] = 'memory'
+            return _loaded[bib_file][1]
+
+        papers = read_cache(bib_file, key)
+        span.args['source'] = 'cache'
+        if papers is None:
+            span.args['source'] = 'parse'
+            papers = parse_papers(bib_file)
+            write_cache(bib_file, key, papers)
+        span.args['papers'] = len(papers)
+        _loaded[bib_file] = (key, papers)
+        return papers
+
+
+def read_cache(bib_file, key: str):
+    path = cache_path(bib_file)
+    try:
+        cached = json.loads(path.read_text(encoding='utf-8'))
+        if cached.get('key') == key:
+            pf.debug("  bib cache → hit")
+            return [Paper.from_row(row) for row in cached['papers']]
+    except (OSError, ValueError):
+        pass
+    pf.debug("  bib cache → miss")
+    return None
+
+
+def write_cache(bib_file, key: str, papers: List[Paper]):
+    path = cache_path(bib_file)
+    try:
+        write_text(path, json.dumps({'key': key, 'papers': [p.to_row() for p in papers]}))
+    except OSError as e:
+        pf.debug(f"  bib cache → not written ({e})")
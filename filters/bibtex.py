@@ -0,0 +1,210 @@
+"""
+Streaming BibTeX reader for the fields the filters use.
+
+Reads one entry at a time and extracts only the plain field values (brace- or
+quote-delimited, or numbers) and the author names, reduced the way
+bibliography.person_name reduces pybtex's Person objects. Anything outside that
+subset (@string macros, `#` concatenation or macros in a used field, braces or
+TeX commands in names, duplicate keys) raises Unsupported, and the caller
+falls back to pybtex for the whole file.
+"""
+
+import functools
+import re
+from typing import Dict, Iterator, List, Tuple
+
+# Fields the filters read; values of other fields are skipped, not interpreted
+FIELDS = frozenset(['author', 'title', 'booktitle', 'journal', 'year', 'url', 'selected'])
+
+TYPE_RE = re.compile(r'@\s*([A-Za-z]+)')
+HEAD_RE = re.compile(r'@\s*([A-Za-z]+)\s*\{\s*([^,\s{}]*)\s*,')
+FIELD_RE = re.compile(r'\s*([A-Za-z][\w:.+/-]*)\s*=\s*')
+# The common case in one match: a field with a single value without nested braces
+SIMPLE_FIELD_RE = re.compile(r'\s*([A-Za-z][\w:.+/-]*)\s*=\s*(?:\{([^{}]*)\}|"([^"{}]*)"|(\d+))\s*([,}])\s*')
+NUMBER_RE = re.compile(r'\d+')
+MACRO_RE = re.compile(r'[A-Za-z][\w:.+/-]*')
+DELIMITER_RE = re.compile(r'[{}"]')
+BRACE_RE = re.compile(r'[{}]')
+SEPARATOR_RE = re.compile(r'\s*(#|,|\})\s*')
+AND_RE = re.compile(r'\s+and\s+', re.IGNORECASE)
+
+
+class Unsupported(Exception):
+    """A construct this reader does not handle; parse the file with pybtex instead"""
+
+
+def entries(lines) -> Iterator[str]:
+    """
+    Split a stream of lines into the text of each @entry{...}, one at a time.
+    Text between entries is a comment in BibTeX and is skipped.
+    """
+    buf = []
+    depth = 0
+    for line in lines:
+        if not buf:
+            at = line.find('@')
+            if at < 0:
+                continue
+            line = line[at:]
+        buf.append(line)
+        # BibTeX itself does not treat \{ as an escape, so plain counting matches it
+        depth += line.count('{') - line.count('}')
+        if depth < 0:
+            raise Unsupported("unbalanced braces")
+        if depth == 0:
+            if '{' not in buf[0]:
+                raise Unsupported(f"entry without braces: {buf[0].strip()}")
+            yield ''.join(buf)
+            buf = []
+    if buf:
+        raise Unsupported("unterminated entry")
+
+
+def delimited(text: str, start: int) -> Tuple[str, int]:
+    """Value delimited by braces or quotes starting at text[start]; returns (value, end)"""
+    closing = text[start]
+    # Most values have no nested braces: one find() instead of walking the delimiters
+    end = text.find('}' if closing == '{' else '"', start + 1)
+    if end >= 0 and text.find('{', start + 1, end) < 0:
+        return text[start + 1:end], end + 1
+    depth = 0
+    pattern = BRACE_RE if closing == '{' else DELIMITER_RE
+    for m in pattern.finditer(text, start + 1):
+        c = m.group()
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            if depth == 0:
+                if closing != '{':
+                    raise Unsupported("unbalanced braces in a quoted value")
+                return text[start + 1:m.start()], m.end()
+            depth -= 1
+        elif depth == 0:
+            return text[start + 1:m.start()], m.end()
+    raise Unsupported("unterminated value")
+
+
+def fields(text: str) -> Tuple[str, str, Dict[str, str]]:
+    """Parse one entry's text into (type, key, used fields with whitespace-normalized values)"""
+    head = HEAD_RE.match(text)
+    if not head:
+        raise Unsupported(f"cannot parse entry head: {text[:40].strip()}")
+    entry_type, key = head.group(1).lower(), head.group(2)
+    values = {}
+    pos = head.end()
+    while True:
+        simple = SIMPLE_FIELD_RE.match(text, pos)
+        if simple:
+            name = simple.group(1).lower()
+            if name in FIELDS:
+                value = next(v for v in simple.group(2, 3, 4) if v is not None)
+                values[name] = ' '.join(value.split())
+            pos = simple.end()
+            if simple.group(5) == '}':
+                if text[pos:].strip():
+                    raise Unsupported(f"text after the end of {key}")
+                return entry_type, key, values
+            continue
+        field = FIELD_RE.match(text, pos)
+        if not field:
+            if text[pos:].strip() == '}':
+                return entry_type, key, values
+            raise Unsupported(f"cannot parse fields of {key}")
+        name = field.group(1).lower()
+        pos = field.end()
+        parts = []
+        while True:
+            if pos < len(text) and text[pos] in '{"':
+                value, pos = delimited(text, pos)
+                parts.append(value)
+            elif number := NUMBER_RE.match(text, pos):
+                parts.append(number.group())
+                pos = number.end()
+            elif macro := MACRO_RE.match(text, pos):
+                # e.g. month = jan; only a problem if the filters read the field
+                if name in FIELDS:
+                    raise Unsupported(f"macro in {name} of {key}")
+                pos = macro.end()
+            else:
+                raise Unsupported(f"cannot parse {name} of {key}")
+            separator = SEPARATOR_RE.match(text, pos)
+            if not separator:
+                raise Unsupported(f"cannot parse {name} of {key}")
+            pos = separator.end()
+            if separator.group(1) != '#':
+                break
+            if name in FIELDS:
+                raise Unsupported(f"concatenation in {name} of {key}")
+        if name in FIELDS:
+            values[name] = ' '.join(''.join(parts).split())
+        if separator.group(1) == '}':
+            if text[pos:].strip():
+                raise Unsupported(f"text after the end of {key}")
+            return entry_type, key, values
+
+
+def is_von(token: str) -> bool:
+    if not token[0].isalpha():
+        raise Unsupported(f"cannot classify name part {token}")
+    return token[0].islower()
+
+
+def split_von_last(tokens: List[str]) -> List[str]:
+    """Last name tokens of "von Last": everything after the last lowercase token but the final one"""
+    von = [i for i, token in enumerate(tokens[:-1]) if is_von(token)]
+    if von and von[0] != 0:
+        raise Unsupported(f"unusual name: {' '.join(tokens)}")
+    return tokens[von[-1] + 1:] if von else tokens
+
+
+@functools.lru_cache(maxsize=None)
+def person_name(name: str) -> str:
+    """
+    BibTeX name -> "First Last", dropping middle names, "von" parts and "Jr",
+    exactly like bibliography.person_name does for pybtex's Person.
+    Memoized: co-authors repeat across most entries.
+    """
+    if '{' in name or '\\' in name or '~' in name:
+        raise Unsupported(f"TeX in name: {name}")
+    parts = [part.split() for part in name.split(',')]
+    if len(parts) == 1:
+        tokens = parts[0]
+        if len(tokens) == 1:
+            return tokens[0]
+        von = [i for i, token in enumerate(tokens[:-1]) if is_von(token)]
+        if von:
+            first_middle, last = tokens[:von[0]], tokens[von[-1] + 1:]
+        else:
+            first_middle, last = tokens[:-1], tokens[-1:]
+    elif len(parts) in (2, 3):
+        last, first_middle = split_von_last(parts[0]), parts[-1]
+        if not last:
+            raise Unsupported(f"name without a last part: {name}")
+    else:
+        raise Unsupported(f"too many commas in name: {name}")
+    return f"{first_middle[0]} {' '.join(last)}" if first_middle else ' '.join(last)
+
+
+def read(bib_file) -> Iterator[Tuple[str, Dict[str, str], List[str]]]:
+    """
+    Stream the entries of a bib file.
+
+    Yields:
+        (key, used fields, "First Last" author names) for each entry, in file order
+    """
+    seen = set()
+    with open(bib_file, encoding='utf-8') as f:
+        for text in entries(f):
+            entry_type = TYPE_RE.match(text)
+            entry_type = entry_type.group(1).lower() if entry_type else None
+            if entry_type in ('comment', 'preamble'):
+                continue
+            if entry_type == 'string':
+                raise Unsupported("@string macros")
+            _, key, values = fields(text)
+            if key in seen:
+                raise Unsupported(f"repeated entry {key}")
+            seen.add(key)
+            authors = values.pop('author', '')
+            names = [person_name(n) for n in AND_RE.split(authors)] if authors else []
+            yield key, values, names
@@ -0,0 +1,41 @@
+"""
+Cache location and atomic file writes, shared by the filters and builder/.
+
+Every on-disk cache lives under CACHE_DIR (.cache, or $SITE_CACHE_DIR). Files
+are written to a temporary sibling and renamed into place, so concurrent
+filters and build threads never read a partial file.
+"""
+
+import json
+import os
+import pathlib
+import threading
+
+CACHE_DIR = os.environ.get('SITE_CACHE_DIR', '.cache')
+
+
+def tmp_path(path) -> pathlib.Path:
+    """A sibling of path to write first, unique to this process and thread"""
+    path = pathlib.Path(path)
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def write_text(path, text: str):
+    """Write text to path atomically, creating its directory"""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = tmp_path(path)
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def write_json(path, data) -> bool:
+    """Write data as compact JSON unless the file already holds exactly it; returns whether it was written"""
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    try:
+        if pathlib.Path(path).read_text(encoding='utf-8') == text:
+            return False
+    except OSError:
+        pass
+    write_text(path, text)
+    return True
@@ -0,0 +1,144 @@
+"""
+Responsive images for the HTML pages.
+
+Local JPEG/PNG/WebP images are resized to a few widths and encoded as WebP and
+JPEG. Variants live in a content-addressed cache (keyed by the image's bytes
+and the encoding settings), so an image is only re-encoded when it changes;
+missing variants of an image are encoded in parallel. The pf.Image is then
+wrapped in a <picture> with a WebP <source>, and gets a JPEG srcset, `sizes`
+and its intrinsic width/height so the layout does not shift while it loads.
+Without Pillow, images are left as they are.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import panflute as pf
+
+import tracing
+from cache import CACHE_DIR, tmp_path, write_text
+
+# Bump when the encoding changes so every variant is made again
+IMAGES_VERSION = 1
+
+WIDTHS = (160, 320, 640, 960, 1280)
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+QUALITY = 80
+RESIZABLE = ('.jpg', '.jpeg', '.png', '.webp')
+# Published variants, relative to the output directory
+VARIANTS_DIR = os.path.join('images', 'resized')
+
+
+def variant_widths(width: int) -> List[int]:
+    """Widths to encode for an image `width` pixels wide: the smaller WIDTHS and the full width"""
+    return [w for w in WIDTHS if w < width] + [width]
+
+
+def cache_dir(data: bytes) -> pathlib.Path:
+    h = hashlib.sha256(f"v{IMAGES_VERSION}\0{WIDTHS}\0{QUALITY}\0".encode())
+    h.update(data)
+    return pathlib.Path(CACHE_DIR) / 'images' / h.hexdigest()[:16]
+
+
+def encode(source: str, width: int, fmt: str, path: pathlib.Path):
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.width != width:
+            im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+        if fmt == 'jpeg' and im.mode not in ('RGB', 'L'):
+            im = im.convert('RGB')
+        tmp = tmp_path(path)
+        im.save(tmp, FORMATS[fmt], quality=QUALITY)
+    os.replace(tmp, path)
+
+
+def variants(source: str):
+    """
+    Encode (or reuse) the variants of one image.
+
+    Returns:
+        (cache directory, width, height) of the image, with `<width>.<format>`
+        files for every variant width in the cache directory
+    """
+    from PIL import Image, ImageOps
+
+    directory = cache_dir(pathlib.Path(source).read_bytes())
+    size_file = directory / 'size.json'
+    try:
+        width, height = json.loads(size_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        with Image.open(source) as im:
+            width, height = ImageOps.exif_transpose(im).size
+
+    missing = [(w, fmt) for w in variant_widths(width) for fmt in FORMATS if not (directory / f"{w}.{fmt}").exists()]
+    with tracing.span('images', file=source, encoded=len(missing)):
+        if missing:
+            directory.mkdir(parents=True, exist_ok=True)
+            with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+                # Pillow releases the GIL while resizing and encoding
+                futures = [pool.submit(encode, source, w, fmt, directory / f"{w}.{fmt}") for w, fmt in missing]
+                for future in futures:
+                    future.result()
+            write_text(size_file, json.dumps([width, height]))
+    pf.debug(f"  image → {source} ({len(missing)} encoded)")
+    return directory, width, height
+
+
+def srcset(urls) -> str:
+    return ", ".join(f"{url} {w}w" for w, url in urls)
+
+
+def responsive(image: pf.Image, page_dir: str, output_dir: str, sizes: str) -> Optional[List[pf.Inline]]:
+    """
+    Rewrite a local image to use resized variants.
+
+    Args:
+        image: The image (its url is relative to the page)
+        page_dir: Directory of the generated page, e.g. docs or docs/posts
+        output_dir: Site output directory, where the variants are published
+        sizes: The `sizes` attribute (rendered width of the image per viewport)
+
+    Returns:
+        The inlines to replace the image with, or None to leave it as it is
+    """
+    url = image.url
+    if '://' in url or url.startswith(('/', 'data:')) or not url.lower().endswith(RESIZABLE):
+        return None
+    source = os.path.normpath(os.path.join(page_dir, url))
+    if not os.path.exists(source):
+        return None
+    try:
+        directory, width, height = variants(source)
+    except ImportError:
+        pf.debug("  image → Pillow not installed; using the original")
+        return None
+
+    published = os.path.join(output_dir, VARIANTS_DIR)
+    os.makedirs(published, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    urls = {fmt: [] for fmt in FORMATS}
+    for w in variant_widths(width):
+        for fmt in FORMATS:
+            # The cache directory name is the content hash, so names change with the image
+            path = os.path.join(published, f"{stem}.{directory.name[:8]}.{w}.{fmt}")
+            if not os.path.exists(path):
+                shutil.copyfile(directory / f"{w}.{fmt}", path)
+            urls[fmt].append((w, os.path.relpath(path, page_dir).replace(os.sep, '/')))
+
+    # The original stays as src for browsers without srcset support; srcset
+    # only names content-addressed copies, so they can be cached forever
+    image.attributes.update({
+        'srcset': srcset(urls['jpeg']),
+        'sizes': sizes,
+        'width': str(width),
+        'height': str(height),
+    })
+    webp = f'<source type="image/webp" srcset="{srcset(urls["webp"])}" sizes="{sizes}">'
+    return [pf.RawInline('<picture>', format='html'), pf.RawInline(webp, format='html'), image, pf.RawInline('</picture>', format='html')]
@@ -8,10 +8,17 @@ Combines functionality from news.py, publications.py, and sections.py filters.
 from typing import List, Tuple
 import panflute as pf
 import os
-import pathlib
-import markdown
 import datetime
-from pybtex.database import parse_file, Person
+import images
+import news
+import search
+import tracing
+from bibliography import author_elements, author_runs, load_papers
+from sections import SectionIndex
+from shards import write_fallback_page, write_shards
+
+# Search box and client, inserted when the `search` metadata field is set
+SEARCH_TEMPLATE = 'templates/search.html'
 
 # ============================================================================
 # News filter functions
@@ -25,23 +32,19 @@ def load_news_items(doc):
 
     if not news_dir:
         pf.debug("  no news")
+        doc.news_meta = {}
         return []
 
     pf.debug(f"  news dir → {news_dir}")
-    news_files = [f for f in os.listdir(news_dir) if f.endswith('.md')]
-    # files count redundant with items; omit
-    for news_file in news_files:
-        news_path = os.path.join(news_dir, news_file)
-
-        data = pathlib.Path(news_path).read_text(encoding='utf-8')
-        md = markdown.Markdown(extensions=['meta'])
-        md.convert(data)
-
-        assert 'date' in md.Meta, f"Missing 'date' metadata in {news_file}"
-        assert 'title' in md.Meta, f"Missing 'title' metadata in {news_file}"
-
-        date = datetime.datetime.strptime(md.Meta['date'][0], '%m/%Y').date()
-        title = md.Meta['title'][0]
+    # Only the meta headers are read, and only for posts changed since the last build;
+    # the search index reuses them
+    doc.news_meta = news.load_meta(news_dir)
+    for news_file, meta in doc.news_meta.items():
+        assert 'date' in meta, f"Missing 'date' metadata in {news_file}"
+        assert 'title' in meta, f"Missing 'title' metadata in {news_file}"
+
+        date = datetime.datetime.strptime(meta['date'][0], '%m/%Y').date()
+        title = meta['title'][0]
         name = os.path.splitext(news_file)[0]  # Remove the .md extension
         
         news_items.append((date, name, title))
@@ -56,84 +59,55 @@ def load_news_items(doc):
 # Publications filter functions
 # ============================================================================
 
-def clean_venue(text: str) -> str:
-    """
-    "Annual Conference on Neural Information Processing Systems (NeurIPS)" -> "NeurIPS"
-    "International Conference on Computer-Aided Verification (CAV)" -> "CAV" 
-    """
-    return text.split("(")[-1].strip(")")
-
 def load_publications(doc):
     """Load publications from bibtex file (from publications.py)"""
     bib_file = doc.get_metadata('papers')
     if not bib_file:
         pf.debug("  no papers")
-    pubs_bibtex = parse_file(bib_file).entries.values() if (bib_file and os.path.exists(bib_file)) else []
     pf.debug(f"  bib → {bib_file}")
 
-    papers = []
-
-    for pub in pubs_bibtex:
-        selected = pub.fields['selected'].lower() == 'true' if 'selected' in pub.fields else False
-        link = pub.fields["url"] if 'url' in pub.fields else ""
-
-        if "booktitle" in pub.fields:
-            venue = clean_venue(pub.fields['booktitle'])
-        elif "journal" in pub.fields:
-            venue = clean_venue(pub.fields['journal'])
-        else:
-            assert False, f"Missing 'booktitle' or 'journal' metadata in {pub.key}"
-
-        assert 'year' in pub.fields, f"Missing 'year' metadata in {pub.key}"
-        year = pub.fields['year']
-        assert 'title' in pub.fields, f"Missing 'title' metadata in {pub.key}"
-        title = pub.fields['title']
-
-        authors = pub.persons.get('author', [])
-        author_elements = format_author_list(authors)
-
-        paper_info = {
-            'title': title,
-            'venue': venue,
-            'year': year,
-            'selected': selected,
-            'link': link,
-            'author_elements': author_elements,
-        }
+    records = load_papers(bib_file)
+    # (paper, author runs) pairs; runs are memoized per distinct author list
+    with tracing.span('format authors', papers=len(records)):
+        papers = [(paper, author_runs(paper.authors)) for paper in records]
 
-        papers.append(paper_info)
-
-    papers.sort(key=lambda x: (x['year'], x['venue']), reverse=True)
+    papers.sort(key=lambda x: (x[0].year, x[0].venue), reverse=True)
     pf.debug(f"  papers → {len(papers)}")
     return papers
 
-def format_author_list(authors) -> list:
-    """
-    Format a list of authors from pybtex Person objects into a list of panflute elements.
-    
-    Args:
-        authors: List of pybtex Person objects
-    
-    Returns:
-        List of panflute elements (Str, etc.) for the author list
-    """
-    author_elements = []
-    author_names = []
-
-    for author in authors:
-        first = " ".join(author.first_names)
-        last = " ".join(author.last_names)
-        full_name = f"{first} {last}" if first else last
-        author_names.append(full_name)
-
-    for i, name in enumerate(author_names):
-        author_elements.append(pf.Str(name))
-        if i < len(author_names) - 2:
-            author_elements.append(pf.Str(", "))
-        elif i == len(author_names) - 2:
-            author_elements.append(pf.Str(", and " if len(author_names) > 2 else " and "))
-
-    return author_elements
+def publication_row(paper, runs, show_authors) -> pf.TableRow:
+    """One row of the publications table: venue and year, then the title (and authors)"""
+    venue = pf.Str(f"{paper.venue} '{paper.year[-2:]}")
+
+    if show_authors:
+        # CV-style: link on venue, title and authors on same line with ' · '
+        if paper.link:
+            venue_cell = pf.Plain(pf.Link(venue, url=paper.link))
+        else:
+            venue_cell = pf.Plain(venue)
+
+        title_content = [pf.Str(paper.title)]
+        if runs:
+            title_content.append(pf.Str(" · "))
+            title_content.append(pf.Emph(*author_elements(runs)))
+        title_cell = pf.Plain(*title_content)
+    else:
+        # Index-style: link on venue, just title
+        venue_cell = pf.Plain(pf.Link(venue, url=paper.link))
+        title_cell = pf.Plain(pf.Str(paper.title))
+
+    return pf.TableRow(
+        pf.TableCell(venue_cell),
+        pf.TableCell(title_cell),
+        classes=["selected" if paper.selected else "not-selected"]
+    )
+
+def publications_table(rows, show_authors) -> pf.Table:
+    table = pf.Table(pf.TableBody(*rows))
+    if show_authors:
+        table.colspec = [('AlignRight', 0.15), ('AlignLeft', 0.85)]
+        table.classes = ['with-authors']
+    return table
 
 # ============================================================================
 # Sections filter functions
@@ -146,7 +120,11 @@ def emoji(char):
 def load_profile_info(doc):
     """Load profile information (from sections.py)"""
     headshot = doc.get_metadata('headshot')
-    headshot_div = pf.Div(pf.Plain(pf.Image(url=headshot, title="Headshot")), classes=['headshot'])
+    image = pf.Image(url=headshot, title="Headshot")
+    # Resized variants, picked by the headshot's rendered width (--headshot-width in index.css)
+    output_dir = doc.get_metadata('output-dir', 'docs')
+    inlines = images.responsive(image, output_dir, output_dir, doc.get_metadata('headshot-sizes', '130px')) or [image]
+    headshot_div = pf.Div(pf.Plain(*inlines), classes=['headshot'])
     
     email = doc.get_metadata('email')
     email_span = pf.Span(emoji("✉"), pf.Space(), pf.Code(email), classes=['email'])
@@ -159,8 +137,15 @@ def load_profile_info(doc):
 
 def prepare(doc):
     """Prepare function that combines all three filters"""
+    tracing.configure(doc)
+
+    # Section boundaries, recorded by action for finalize
+    doc.sections = SectionIndex()
+
     # Load news items
-    doc.news_items = load_news_items(doc)
+    with tracing.span('news') as span:
+        doc.news_items = load_news_items(doc)
+        span.args['posts'] = len(doc.news_items)
     
     # Load publications
     doc.papers = load_publications(doc)
@@ -173,89 +158,66 @@ def action(elem, doc):
     match elem:
         # Handle news/posts headers (from news.py)
         case pf.Header(identifier=name, level=1) if "news" in name or "posts" in name:
-            rows = []
-            for (i, (date, title)) in enumerate(doc.news_items):
-                classes = ['not-recent'] if i >= 5 else []
-                rows.append(pf.TableRow(pf.TableCell(pf.Plain(date)), pf.TableCell(pf.Plain(title)), classes=classes))
-            toggle_link = pf.Link(
-                pf.Str("(show all)"),
-                url=f"#{name}",
-                classes=["toggle-recent"]
-            )
-            elem.content += [pf.Space(), toggle_link]
-            return pf.Div(elem, pf.Table(pf.TableBody(*rows)), classes=['posts'])
+            with tracing.span('action: news', posts=len(doc.news_items)):
+                rows = []
+                for (i, (date, title)) in enumerate(doc.news_items):
+                    classes = ['not-recent'] if i >= 5 else []
+                    rows.append(pf.TableRow(pf.TableCell(pf.Plain(date)), pf.TableCell(pf.Plain(title)), classes=classes))
+                toggle_link = pf.Link(
+                    pf.Str("(show all)"),
+                    url=f"#{name}",
+                    classes=["toggle-recent"]
+                )
+                elem.content += [pf.Space(), toggle_link]
+                div = pf.Div(elem, pf.Table(pf.TableBody(*rows)), classes=['posts'])
+                doc.sections.mark(elem, block=div)
+                return div
 
         # Handle publications header (from publications.py)
         case pf.Header(identifier=name, level=1) if "publications" in name:
-            div = pf.Div(elem, classes=['publications'])
-            toggle_link = pf.Link(
-                pf.Str("(show all)"),
-                url=f"#{name}",
-                classes=["toggle-publications"]
-            )
-            elem.content += [pf.Space(), toggle_link]
-            rows = []
-            show_authors = doc.get_metadata('authors', False)
-            
-            for paper in doc.papers:
-                venue = pf.Str(f"{paper['venue']} '{paper['year'][-2:]}")
-
-                if show_authors:
-                    # CV-style: link on venue, title and authors on same line with ' · '
-                    if paper['link']:
-                        venue_cell = pf.Plain(pf.Link(venue, url=paper['link']))
-                    else:
-                        venue_cell = pf.Plain(venue)
-
-                    title_content = [pf.Str(paper['title'])]
-                    if paper['author_elements']:
-                        title_content.append(pf.Str(" · "))
-                        title_content.append(pf.Emph(*paper['author_elements']))
-                    title_cell = pf.Plain(*title_content)
-                else:
-                    # Index-style: link on venue, just title
-                    venue_cell = pf.Plain(pf.Link(venue, url=paper['link']))
-                    title_cell = pf.Plain(pf.Str(paper['title']))
-
-                rows.append(pf.TableRow(
-                    pf.TableCell(venue_cell),
-                    pf.TableCell(title_cell),
-                    classes=["selected" if paper['selected'] else "not-selected"]
-                ))
-
-            table = pf.Table(pf.TableBody(*rows))
-            if show_authors:
-                table.colspec = [('AlignRight', 0.15), ('AlignLeft', 0.85)]
-                table.classes = ['with-authors']
-            div.content.append(table)
-            return div
-
-def finalize(doc):
-    """Finalize function from sections.py - creates sections and adds footer"""
-    header_indexes = []
-    # Find all header elements and their indexes
-    for idx, item in enumerate(doc.content):
-        match item:
-            case pf.Header(identifier=name, level=1):
-                header_indexes.append((idx, name))
-            case pf.Div():
-                header_indexes.append((idx, None))
-    header_indexes.append((len(doc.content), None))
-
-    offset = 0
-    # Adjust indexes to account for the offset caused by the replacement of sections
-    for i in range(len(header_indexes) - 1):
-        start_index = header_indexes[i][0] + offset
-        end_index = header_indexes[i + 1][0] + offset
-        name = header_indexes[i][1]
-
+            with tracing.span('action: publications', papers=len(doc.papers)):
+                div = pf.Div(elem, classes=['publications'])
+                toggle_link = pf.Link(
+                    pf.Str("(show all)"),
+                    url=f"#{name}",
+                    classes=["toggle-publications"]
+                )
+                show_authors = doc.get_metadata('authors', False)
+                rows = [publication_row(paper, runs, show_authors) for paper, runs in doc.papers]
+
+                shards = doc.get_metadata('publications-shards', None)
+                if shards:
+                    # Lazy mode: inline only selected rows; the rest is fetched on "(show all)"
+                    out_dir = os.path.join(doc.get_metadata('output-dir', 'docs'), shards)
+                    write_shards(out_dir, doc.papers, show_authors)
+                    header = pf.Header(pf.Str(pf.stringify(elem)), level=1, identifier=name)
+                    write_fallback_page(out_dir, header, publications_table(rows, show_authors), doc)
+                    rows = [row for row in rows if 'selected' in row.classes]
+                    # Without JS the link opens the full list; with JS it loads the shards
+                    toggle_link.url = f"{shards}/index.html"
+                    toggle_link.attributes['data-shards'] = shards
+
+                elem.content += [pf.Space(), toggle_link]
+                table = publications_table(rows, show_authors)
+                div.content.append(table)
+                doc.sections.mark(elem, block=div)
+                return div
+
+        # Remaining top-level headers start sections; other top-level divs end them
+        case pf.Header(identifier=name, level=1):
+            doc.sections.mark(elem, name)
+        case pf.Div():
+            doc.sections.mark(elem)
+
+def rebuild_sections(doc):
+    """Wrap each top-level section (level-1 header up to the next boundary) in a Div"""
+    content = []
+    for name, section_content in doc.sections.runs(doc.content):
         if name is None:
-            # If the header name is None, skip this section
-            continue
+            # Blocks before the first header, or a div that is already a section
+            content.extend(section_content)
         elif name == 'profile':
-            header = doc.content[start_index]
-            # Create a section with the content between the headers
-            section_content = doc.content[start_index+1:end_index]
+            header, section_content = section_content[0], section_content[1:]
             
             # Only put the first paragraph in the blurb class
             if section_content and isinstance(section_content[0], pf.Para):
@@ -264,24 +226,40 @@ def finalize(doc):
                 # Create profile grid with headshot and first paragraph side by side
                 profile_grid = pf.Div(doc.headshot, pf.Div(first_para, classes=['blurb']), classes=['profile'])
                 # Create section with profile grid, then remaining content full-width below
-                section_div = pf.Div(header, profile_grid, *remaining_content, classes=[name])
+                content.append(pf.Div(header, profile_grid, *remaining_content, classes=[name]))
             else:
                 # Fallback to original behavior if no paragraphs
-                section_div = pf.Div(header, doc.headshot, pf.Div(*section_content, classes=['blurb']), classes=[name])
+                content.append(pf.Div(header, doc.headshot, pf.Div(*section_content, classes=['blurb']), classes=[name]))
         else:
             # Create a section with the content between the headers
-            section_content = doc.content[start_index:end_index]
-            section_div = pf.Div(*section_content, classes=[name])
+            content.append(pf.Div(*section_content, classes=[name]))
+
+    # Replace the document's blocks once, instead of splicing per section
+    doc.content = content
 
-        # Replace the content between the headers with the section div
-        doc.content[start_index:end_index] = [section_div]
+def last_updated(doc) -> datetime.date:
+    """SOURCE_DATE_EPOCH (from the build, see builder/reproducible.py) as a UTC date, or today"""
+    epoch = getattr(doc, 'source_date_epoch', None) or os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        return datetime.datetime.fromtimestamp(int(epoch), datetime.timezone.utc).date()
+    return datetime.date.today()
 
-        # Adjust the offset for the next section
-        offset += (start_index - end_index) + 1
+def finalize(doc):
+    """Finalize function from sections.py - creates sections and adds footer"""
+    with tracing.span('sections', blocks=len(doc.content)):
+        rebuild_sections(doc)
     pf.debug("  sections → rebuilt")
 
-    # Add a footer with the current date
-    last_update = pf.Span(pf.Str(f"Last updated: {datetime.datetime.now().strftime('%Y-%m-%d')}"), classes=['last-update'])
+    search_dir = doc.get_metadata('search', None)
+    if search_dir:
+        out_dir = os.path.join(doc.get_metadata('output-dir', 'docs'), search_dir)
+        search.write_index(out_dir, doc.get_metadata('news'), doc.news_meta, doc.papers)
+        # The search box goes right below the profile section
+        at = 1 if doc.content and 'profile' in getattr(doc.content[0], 'classes', []) else 0
+        doc.content.insert(at, search.search_block(search_dir, SEARCH_TEMPLATE))
+
+    # Add a footer with the date of the newest input in reproducible builds, else the current date
+    last_update = pf.Span(pf.Str(f"Last updated: {last_updated(doc).strftime('%Y-%m-%d')}"), classes=['last-update'])
     footer = pf.Div(pf.Plain(doc.email), pf.Plain(last_update), classes=['footer'])
     doc.content.append(footer)
 
@@ -0,0 +1,120 @@
+"""
+Fast metadata loading for news posts.
+Reads only the meta header of each post (same rules as markdown's `meta`
+extension) and keeps a persistent index so unchanged posts are not read at all.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+from typing import Dict, List
+
+import panflute as pf
+
+import tracing
+from cache import CACHE_DIR, write_text
+
+# Bump when the shape of a cached entry changes
+CACHE_VERSION = 1
+
+# index path -> entries, so a long-lived process (build.py --watch) skips re-reading the index
+_indexes = {}
+
+# Same patterns as markdown.extensions.meta
+META_RE = re.compile(r'^[ ]{0,3}(?P<key>[A-Za-z0-9_-]+):\s*(?P<value>.*)')
+META_MORE_RE = re.compile(r'^[ ]{4,}(?P<value>.*)')
+BEGIN_RE = re.compile(r'^-{3}(\s.*)?')
+END_RE = re.compile(r'^(-{3}|\.{3})(\s.*)?')
+
+
+def read_meta(path) -> Dict[str, List[str]]:
+    """
+    Read the meta header block of a markdown file, stopping at its end.
+
+    Returns:
+        Mapping of lowercased key -> list of values, as in `markdown.Markdown.Meta`
+    """
+    meta: Dict[str, List[str]] = {}
+    key = None
+    with open(path, encoding='utf-8') as f:
+        first = True
+        for line in f:
+            line = line.rstrip('\r\n').expandtabs(4)
+            if first:
+                first = False
+                if BEGIN_RE.match(line):
+                    continue
+            if line.strip() == '' or END_RE.match(line):
+                break
+            m1 = META_RE.match(line)
+            if m1:
+                key = m1.group('key').lower().strip()
+                meta.setdefault(key, []).append(m1.group('value').strip())
+                continue
+            m2 = META_MORE_RE.match(line)
+            if m2 and key:
+                meta[key].append(m2.group('value').strip())
+            else:
+                break
+    return meta
+
+
+def index_path(news_dir) -> pathlib.Path:
+    name = hashlib.sha256(os.path.abspath(news_dir).encode()).hexdigest()[:16]
+    return pathlib.Path(CACHE_DIR) / 'news' / f"{name}.json"
+
+
+def load_meta(news_dir) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Load the meta header of every .md file in a news directory.
+
+    Entries in the persistent index are reused while a file's mtime and size
+    are unchanged; only new or modified files are read.
+
+    Returns:
+        Mapping of file name -> meta dict
+    """
+    with tracing.span('news index', dir=news_dir) as span:
+        result, read = scan(news_dir)
+        span.args.update(posts=len(result), read=read)
+    pf.debug(f"  news index → {read} read, {len(result) - read} cached")
+    return result
+
+
+def scan(news_dir):
+    """Refresh the persistent index; returns (file name -> meta, number of files read)"""
+    path = index_path(news_dir)
+    entries = _indexes.get(path)
+    if entries is None:
+        try:
+            cached = json.loads(path.read_text(encoding='utf-8'))
+            if cached.get('version') != CACHE_VERSION:
+                cached = {}
+        except (OSError, ValueError):
+            cached = {}
+        entries = cached.get('files', {})
+
+    result = {}
+    fresh = {}
+    read = 0
+    for news_file in os.listdir(news_dir):
+        if not news_file.endswith('.md'):
+            continue
+        st = os.stat(os.path.join(news_dir, news_file))
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = entries.get(news_file)
+        if entry is None or entry['stat'] != stamp:
+            entry = {'stat': stamp, 'meta': read_meta(os.path.join(news_dir, news_file))}
+            read += 1
+        fresh[news_file] = entry
+        result[news_file] = entry['meta']
+    _indexes[path] = fresh
+
+    if read or fresh.keys() != entries.keys():
+        try:
+            write_text(path, json.dumps({'version': CACHE_VERSION, 'files': fresh}))
+        except OSError as e:
+            pf.debug(f"  news index → not written ({e})")
+    return result, read
@@ -0,0 +1,147 @@
+"""
+Generated publication pages: one per student, venue and year, plus an index.
+
+Pages are rendered with the post template and live one directory below docs/,
+like the posts. Each page's content is hashed, and only pages whose rows
+changed since the last build are rendered again (in parallel, one pandoc per
+page); pages that are no longer generated are removed.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import panflute as pf
+
+import tracing
+from cache import CACHE_DIR, write_text
+from store import PaperStore
+
+# Bump when the page layout changes so every page is rendered again
+PAGES_VERSION = 1
+
+# Template and stylesheets, relative to the repository / to the page
+PAGE_TEMPLATE = 'templates/post.html'
+PAGE_CSS = ['../style/main.css', '../style/post.css']
+
+
+def slug(text: str) -> str:
+    return re.sub(r'[^0-9a-z]+', '-', text.lower()).strip('-') or '_'
+
+
+def page_metadata(title: str, doc) -> dict:
+    """The page's pagetitle (and icon), from the document's author/title and icon"""
+    author = doc.get_metadata('author', None) or doc.get_metadata('title', '')
+    metadata = {'pagetitle': f"{author} · {title}".strip(' ·')}
+    if doc.get_metadata('icon', None):
+        metadata['icon'] = f"../{doc.get_metadata('icon')}"
+    return metadata
+
+
+def render_page(path, blocks: List[pf.Block], title: str, doc):
+    """Render blocks as a standalone page with the post template"""
+    page = pf.Doc(*blocks, metadata=page_metadata(title, doc))
+    html = pf.convert_text(
+        page,
+        input_format='panflute',
+        output_format='html',
+        standalone=True,
+        extra_args=[f'--template={PAGE_TEMPLATE}'] + [f'--css={css}' for css in PAGE_CSS],
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html + "\n")
+
+
+def state_path(out_dir) -> pathlib.Path:
+    name = hashlib.sha256(os.path.abspath(out_dir).encode()).hexdigest()[:16]
+    return pathlib.Path(CACHE_DIR) / 'pages' / f"{name}.json"
+
+
+def page_digest(title: str, content, doc) -> str:
+    """Hash of everything render_page bakes into a page: metadata, template, stylesheets and content"""
+    h = hashlib.sha256(f"v{PAGES_VERSION}\0{title}\0".encode())
+    h.update(json.dumps([page_metadata(title, doc), PAGE_CSS], ensure_ascii=False, sort_keys=True).encode())
+    h.update(pathlib.Path(PAGE_TEMPLATE).read_bytes())
+    h.update(json.dumps(content, ensure_ascii=False).encode())
+    return h.hexdigest()
+
+
+def paper_rows(papers) -> list:
+    return [paper.to_row() + [list(runs)] for paper, runs in papers]
+
+
+def publication_pages(store: PaperStore, students) -> List[Tuple[str, str, list]]:
+    """(file name, title, papers) for every generated page, from the store's indexes"""
+    pages = []
+    for name in sorted(students):
+        if name in store.by_author:
+            pages.append((f"author-{slug(name)}.html", f"Publications with {name}", store.author(name)))
+    for venue in sorted(store.by_venue, key=str.casefold):
+        pages.append((f"venue-{slug(venue)}.html", f"Publications at {venue}", store.venue(venue)))
+    for year in sorted(store.by_year, reverse=True):
+        pages.append((f"year-{slug(year)}.html", f"Publications from {year}", store.year(year)))
+    return pages
+
+
+def index_blocks(pages) -> List[pf.Block]:
+    """Link lists to the generated pages, grouped by kind"""
+    blocks = [pf.Header(pf.Str("Publications"), level=1)]
+    for kind, heading in (('author', "Students"), ('venue', "Venues"), ('year', "Years")):
+        items = [
+            pf.ListItem(pf.Plain(pf.Link(pf.Str(title.split(' ', 2)[-1]), url=file_name)))
+            for file_name, title, _ in pages if file_name.startswith(kind + '-')
+        ]
+        if items:
+            blocks += [pf.Header(pf.Str(heading), level=2), pf.BulletList(*items)]
+    return blocks
+
+
+def write_pages(out_dir, store: PaperStore, students, doc, table: Callable[[list], pf.Table]):
+    """
+    Write the per-student, per-venue and per-year pages and their index to out_dir.
+
+    Args:
+        out_dir: Directory for the pages (stale pages in it are removed)
+        store: Index over the sorted (paper, author runs) pairs
+        students: Names that get a page of their own (if they have papers)
+        doc: The filtered document (for the page title and icon)
+        table: Builds the publications table for a list of (paper, runs) pairs
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    pages = publication_pages(store, students)
+
+    path = state_path(out_dir)
+    try:
+        state = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        state = {}
+
+    digests = {}
+    jobs = []
+    for file_name, title, papers in pages:
+        digests[file_name] = page_digest(title, paper_rows(papers), doc)
+        if state.get(file_name) != digests[file_name] or not os.path.exists(os.path.join(out_dir, file_name)):
+            jobs.append((file_name, [pf.Header(pf.Str(title), level=1), table(papers)], title))
+    listing = [(file_name, title) for file_name, title, _ in pages]
+    digests['index.html'] = page_digest("Publications", listing, doc)
+    if state.get('index.html') != digests['index.html'] or not os.path.exists(os.path.join(out_dir, 'index.html')):
+        jobs.append(('index.html', index_blocks(pages), "Publications"))
+
+    with tracing.span('publication pages', pages=len(digests), rendered=len(jobs)):
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+            for future in [pool.submit(render_page, os.path.join(out_dir, f), b, t, doc) for f, b, t in jobs]:
+                future.result()
+
+    for stale in os.listdir(out_dir):
+        if stale.endswith('.html') and stale not in digests:
+            os.remove(os.path.join(out_dir, stale))
+
+    try:
+        write_text(path, json.dumps(digests))
+    except OSError as e:
+        pf.debug(f"  pages state → not written ({e})")
+    pf.debug(f"  pages → {len(jobs)} of {len(digests)} rendered in {out_dir}")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+"""
+Post filter: serves the images in a post as resized, responsive variants.
+"""
+
+import os
+import panflute as pf
+import images
+import tracing
+
+def prepare(doc):
+    tracing.configure(doc)
+    # Posts are written to <output-dir>/posts; image urls are relative to that
+    doc.output_dir = doc.get_metadata('output-dir', 'docs')
+    doc.page_dir = os.path.join(doc.output_dir, 'posts')
+    # The content column of post.css is at most 750px wide
+    doc.image_sizes = doc.get_metadata('image-sizes', '(max-width: 750px) 100vw, 750px')
+
+def action(elem, doc):
+    match elem:
+        # Posts are only written as HTML; the build runs this filter as a json
+        # pipe stage, where doc.format is 'json', so there is no format guard
+        case pf.Image():
+            with tracing.span('action: image', url=elem.url):
+                return images.responsive(elem, doc.page_dir, doc.output_dir, doc.image_sizes)
+
+def main(doc=None):
+    return pf.run_filter(action, prepare=prepare, doc=doc)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Static full-text search index for the posts and publications.
+
+Posts (title and body) and papers (title, venue, year, authors) are tokenized
+into an inverted index, split into small JSON shards by the first characters
+of each term, so the browser fetches only the shards a query's terms fall in
+and matches prefixes within them. Post tokens are cached by file stat, and
+shards whose content did not change are not rewritten.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import pathlib
+import re
+import unicodedata
+from typing import Dict
+
+import panflute as pf
+
+import news
+import tracing
+from cache import CACHE_DIR, write_json
+
+# Bump when tokenization or the shard layout changes
+SEARCH_VERSION = 1
+
+# Shards hold every term starting with the same PREFIX_LENGTH characters;
+# templates/search.html must use the same length and file naming
+PREFIX_LENGTH = 2
+TITLE_WEIGHT = 5
+WORD_RE = re.compile(r'\w+')
+STOPWORDS = frozenset("""
+    a an and are as at be by for from has have in is it its of on or that the
+    this to was were will with we our i my you your
+""".split())
+# Link targets, raw HTML tags and the meta header are not searchable text
+MARKUP_RE = re.compile(r'\]\([^)]*\)|<[^>]+>')
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents, like normalize() in templates/search.html"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokens(text: str) -> collections.Counter:
+    words = WORD_RE.findall(normalize(text))
+    return collections.Counter(w for w in words if len(w) >= PREFIX_LENGTH and w not in STOPWORDS)
+
+
+def shard_name(term: str) -> str:
+    return ''.join(c if c in '0123456789abcdefghijklmnopqrstuvwxyz' else f"_{ord(c):x}" for c in term[:PREFIX_LENGTH])
+
+
+def post_body(path) -> str:
+    """Text of a post after its meta header"""
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    # The header ends at the first blank line or closing fence (see news.read_meta)
+    start = 1 if lines and news.BEGIN_RE.match(lines[0]) else 0
+    for i in range(start, len(lines)):
+        if lines[i].strip() == '' or news.END_RE.match(lines[i]):
+            return MARKUP_RE.sub(' ', '\n'.join(lines[i + 1:]))
+    return ''
+
+
+def cache_path(news_dir) -> pathlib.Path:
+    name = hashlib.sha256(os.path.abspath(news_dir).encode()).hexdigest()[:16]
+    return pathlib.Path(CACHE_DIR) / 'search' / f"{name}.json"
+
+
+def post_terms(news_dir, news_meta) -> Dict[str, Dict[str, int]]:
+    """
+    Term scores of every post, read again only for posts whose stat changed.
+
+    Args:
+        news_dir: Directory with the posts
+        news_meta: File name -> meta, as loaded by news.load_meta for the news section
+    """
+    path = cache_path(news_dir)
+    try:
+        cached = json.loads(path.read_text(encoding='utf-8'))
+        if cached.get('version') != SEARCH_VERSION:
+            cached = {}
+    except (OSError, ValueError):
+        cached = {}
+    entries = cached.get('files', {})
+
+    fresh = {}
+    read = 0
+    for news_file, meta in news_meta.items():
+        st = os.stat(os.path.join(news_dir, news_file))
+        stamp = [st.st_mtime_ns, st.st_size]
+        entry = entries.get(news_file)
+        if entry is None or entry['stat'] != stamp:
+            terms = tokens(post_body(os.path.join(news_dir, news_file)))
+            for term, count in tokens(' '.join(meta.get('title', []))).items():
+                terms[term] += count * TITLE_WEIGHT
+            entry = {'stat': stamp, 'terms': dict(terms)}
+            read += 1
+        fresh[news_file] = entry
+
+    if read or fresh.keys() != entries.keys():
+        write_json(path, {'version': SEARCH_VERSION, 'files': fresh})
+    pf.debug(f"  search → {read} posts tokenized, {len(fresh) - read} cached")
+    return {news_file: entry['terms'] for news_file, entry in fresh.items()}
+
+
+def paper_id(paper) -> str:
+    """
+    Stable id, so adding a paper does not renumber (and rewrite) every shard.
+    The venue and link tell apart versions of one paper (preprint and venue) from the same year.
+    """
+    key = "\0".join([paper.year, paper.title, paper.venue, paper.link])
+    return 'p' + hashlib.sha1(key.encode()).hexdigest()[:8]
+
+
+def write_index(out_dir, news_dir, news_meta, papers):
+    """
+    Write docs.json (id -> [title, url, kind, date]) and one shard per term prefix.
+
+    Args:
+        out_dir: Directory for the index (stale shards in it are removed)
+        news_dir: Directory with the posts, also their url prefix
+        news_meta: File name -> meta of the posts, from news.load_meta
+        papers: Sorted (paper, author runs) pairs, as in doc.papers
+    """
+    docs = {}
+    postings = collections.defaultdict(list)
+    with tracing.span('search index', posts=len(news_meta), papers=len(papers)) as span:
+        if news_dir:
+            for news_file, terms in post_terms(news_dir, news_meta).items():
+                meta = news_meta[news_file]
+                name = os.path.splitext(news_file)[0]
+                doc_id = f"n{name}"
+                docs[doc_id] = [meta['title'][0], f"{news_dir}/{name}.html", 'post', meta['date'][0]]
+                for term, score in terms.items():
+                    postings[term].append([doc_id, score])
+
+        for paper, _ in papers:
+            doc_id = base = paper_id(paper)
+            # Duplicate entries (same year, title, venue and link) still get ids of their own
+            n = 1
+            while doc_id in docs:
+                n += 1
+                doc_id = f"{base}-{n}"
+            docs[doc_id] = [paper.title, paper.link, 'paper', paper.year]
+            terms = tokens(paper.title)
+            for term in terms:
+                terms[term] *= TITLE_WEIGHT
+            terms.update(tokens(' '.join([paper.venue, paper.year, *paper.authors])))
+            for term, score in terms.items():
+                postings[term].append([doc_id, score])
+
+        shards = collections.defaultdict(dict)
+        for term, entries in postings.items():
+            entries.sort(key=lambda e: (-e[1], e[0]))
+            shards[shard_name(term)][term] = entries
+
+        os.makedirs(out_dir, exist_ok=True)
+        written = sum(write_json(os.path.join(out_dir, f"{name}.json"), terms) for name, terms in shards.items())
+        written += write_json(os.path.join(out_dir, 'docs.json'), docs)
+        for stale in os.listdir(out_dir):
+            name = os.path.splitext(stale)[0]
+            if stale.endswith('.json') and name != 'docs' and name not in shards:
+                os.remove(os.path.join(out_dir, stale))
+        span.args.update(terms=len(postings), shards=len(shards), written=written)
+    pf.debug(f"  search → {len(postings)} terms in {len(shards)} shards ({written} files written)")
+
+
+def search_block(search_dir: str, template: str) -> pf.RawBlock:
+    """The search box and its script, pointed at the index directory"""
+    with open(template, encoding='utf-8') as f:
+        return pf.RawBlock(f.read().replace('$search$', search_dir), format='html')
@@ -0,0 +1,54 @@
+"""
+Section index shared by the index and CV filters.
+`action` marks the top-level blocks that start (or end) sections as the walk
+passes them, so `finalize` can regroup doc.content in one linear pass instead
+of rescanning and splicing the document for every section.
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+import panflute as pf
+
+
+class SectionIndex:
+    """Top-level section boundaries, recorded once while the filter walks the document"""
+
+    def __init__(self):
+        # id(block) -> (block, section name or None for a boundary that starts no section)
+        self.marks = {}
+
+    def mark(self, elem, name: Optional[str] = None, block=None):
+        """
+        Record a section boundary if `elem` is a top-level block.
+
+        Args:
+            elem: The element `action` was called with (its parent decides whether it is top-level)
+            name: Section name, or None for a block that only ends the previous section
+            block: The block that will sit in doc.content, if `action` replaces `elem`
+        """
+        if isinstance(elem.parent, pf.Doc):
+            block = elem if block is None else block
+            self.marks[id(block)] = (block, name)
+
+    def is_marked(self, block) -> bool:
+        mark = self.marks.get(id(block))
+        return mark is not None and mark[0] is block
+
+    def runs(self, blocks) -> Iterator[Tuple[Optional[str], List]]:
+        """
+        Split blocks at every marked block, in one pass.
+
+        Yields:
+            (name, blocks) for each run; a run starts at a marked block (whose name
+            it carries) and ends before the next one. Blocks before the first mark
+            form a run named None.
+        """
+        name, run = None, []
+        for block in blocks:
+            if self.is_marked(block):
+                if run:
+                    yield name, run
+                name, run = self.marks[id(block)][1], []
+            run.append(block)
+        if run:
+            yield name, run
@@ -0,0 +1,54 @@
+"""
+Lazily loaded publications for the index page.
+
+Instead of inlining every paper, the index filter can inline only the selected
+ones and write the full list as small JSON shards (one per year) that
+templates/selected.html fetches when "(show all)" is clicked. A standalone
+page with the full list is written next to the shards as the no-JS fallback.
+"""
+
+import glob
+import os
+import re
+
+import panflute as pf
+
+from cache import write_json
+from pages import render_page
+
+
+def shard_name(year: str) -> str:
+    return re.sub(r'[^0-9A-Za-z_-]', '_', year) or '_'
+
+
+def write_shards(out_dir, papers, show_authors: bool):
+    """
+    Write papers as per-year JSON shards plus an index.json listing them.
+
+    Args:
+        out_dir: Directory for the shards (stale shards in it are removed)
+        papers: Sorted (paper, author runs) pairs, as in doc.papers
+        show_authors: Whether rows carry author runs (CV-style rows)
+
+    Each shard is a list of [venue label, title, link, selected, runs] rows in
+    page order; index.json holds the shard names in the same order.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    shards = {}
+    for paper, runs in papers:
+        row = [f"{paper.venue} '{paper.year[-2:]}", paper.title, paper.link, paper.selected]
+        row.append([list(run) for run in runs] if show_authors else None)
+        shards.setdefault(shard_name(paper.year), []).append(row)
+
+    for stale in glob.glob(os.path.join(out_dir, '*.json')):
+        if os.path.splitext(os.path.basename(stale))[0] not in shards and not stale.endswith('index.json'):
+            os.remove(stale)
+    for name, rows in shards.items():
+        write_json(os.path.join(out_dir, f"{name}.json"), rows)
+    write_json(os.path.join(out_dir, 'index.json'), {'shards': list(shards), 'authors': show_authors})
+    pf.debug(f"  shards → {len(shards)} in {out_dir}")
+
+
+def write_fallback_page(out_dir, header: pf.Header, table: pf.Table, doc):
+    """Render a standalone page with the full publications table"""
+    render_page(os.path.join(out_dir, 'index.html'), [header, table], "Publications", doc)
@@ -0,0 +1,38 @@
+"""
+In-memory index over the parsed bibliography.
+Built once per filter run from the sorted (paper, author runs) pairs, so pages
+for one author, venue or year are looked up instead of scanning every paper.
+"""
+
+from typing import Dict, List, Tuple
+
+import tracing
+
+
+class PaperStore:
+    """Sorted (paper, author runs) pairs, indexed by author, venue and year"""
+
+    def __init__(self, papers: List[Tuple]):
+        self.papers = papers
+        # key -> positions in self.papers, in page order
+        self.by_author: Dict[str, List[int]] = {}
+        self.by_venue: Dict[str, List[int]] = {}
+        self.by_year: Dict[str, List[int]] = {}
+        with tracing.span('index papers', papers=len(papers)):
+            for i, (paper, _) in enumerate(papers):
+                for name in paper.authors:
+                    self.by_author.setdefault(name, []).append(i)
+                self.by_venue.setdefault(paper.venue, []).append(i)
+                self.by_year.setdefault(paper.year, []).append(i)
+
+    def select(self, positions: List[int]) -> List[Tuple]:
+        return [self.papers[i] for i in positions]
+
+    def author(self, name: str) -> List[Tuple]:
+        return self.select(self.by_author.get(name, []))
+
+    def venue(self, venue: str) -> List[Tuple]:
+        return self.select(self.by_venue.get(venue, []))
+
+    def year(self, year: str) -> List[Tuple]:
+        return self.select(self.by_year.get(year, []))
@@ -0,0 +1,168 @@
+"""
+Streaming runner for filters that only need one top-level block at a time.
+
+pf.run_filter turns the whole JSON AST into panflute objects before the first
+`action` call. This runner reads the document's api version and metadata, then
+decodes, filters and writes the top-level blocks one by one, so memory stays
+bounded by the largest single block (e.g. one long table) instead of growing
+with the document. Pandoc writes "meta" before "blocks", which is what lets
+`prepare` see the metadata before the first block arrives.
+
+Enabled by the SITE_STREAM environment variable for filters that support it.
+The output is the same JSON that pf.dump writes for the same filtered blocks.
+"""
+
+import io
+import json
+import re
+import sys
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+import panflute as pf
+from panflute.elements import from_json
+
+STREAM_ENV = 'SITE_STREAM'
+
+CHUNK_SIZE = 1 << 16
+SPACE_RE = re.compile(r'\s*')
+
+
+class Reader:
+    """Incremental JSON reader over a text stream, one complete value at a time"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder(object_hook=from_json)
+
+    def fill(self):
+        """Drop the consumed text and read more; at least as much as is buffered, so retries stay rare"""
+        if self.eof:
+            raise ValueError("unexpected end of the JSON document")
+        chunk = self.stream.read(max(CHUNK_SIZE, len(self.buffer) - self.pos))
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self) -> str:
+        """Next non-whitespace character, without consuming it"""
+        while True:
+            self.pos = SPACE_RE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            self.fill()
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if c not in chars:
+            raise ValueError(f"expected one of {chars!r} in the JSON document, found {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        """
+        Decode the next value. Objects, arrays and strings only decode once their
+        closing delimiter is buffered, so a failure means "read more" until EOF.
+        """
+        self.peek()
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill()
+
+
+def read_document(stream) -> Tuple[pf.Doc, Iterator[pf.Block]]:
+    """
+    Start reading a pandoc JSON document.
+
+    Returns:
+        (doc with the metadata and api version but no content, iterator over the
+        top-level blocks; it must be consumed before the stream is closed)
+    """
+    reader = Reader(stream)
+    head = {}
+    reader.expect('{')
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'blocks':
+            break
+        head[key] = reader.value()
+        if reader.expect(',}') == '}':
+            raise ValueError("JSON document without blocks")
+    if 'meta' not in head:
+        raise ValueError("JSON document with its metadata after the blocks")
+    doc = pf.Doc(metadata=head['meta'], api_version=head['pandoc-api-version'])
+
+    def blocks():
+        reader.expect('[')
+        if reader.peek() == ']':
+            reader.pos += 1
+        else:
+            while True:
+                yield reader.value()
+                if reader.expect(',]') == ']':
+                    break
+        # Nothing pandoc writes follows the blocks, but skip it like json.load would
+        while reader.expect(',}') == ',':
+            reader.value()
+            reader.expect(':')
+            reader.value()
+
+    return doc, blocks()
+
+
+def dumps(value) -> str:
+    """Serialize like pf.dump: compact, non-ASCII kept, elements through to_json"""
+    return json.dumps(value, default=lambda elem: elem.to_json(), check_circular=False,
+                      separators=(',', ':'), ensure_ascii=False)
+
+
+def run_filter(transform: Callable[[pf.Block, pf.Doc], Iterable[pf.Block]],
+               prepare: Optional[Callable[[pf.Doc], None]] = None,
+               finish: Optional[Callable[[pf.Doc], Iterable[pf.Block]]] = None,
+               input_stream=None, output_stream=None, format: Optional[str] = None):
+    """
+    Filter a pandoc JSON document one top-level block at a time.
+
+    Args:
+        transform: Called with each top-level block; returns the blocks to write in its place
+        prepare: Called once with the metadata-only doc before the first block
+        finish: Called after the last block; returns blocks to append
+        input_stream: Text stream with the JSON AST (default: stdin)
+        output_stream: Text stream for the filtered AST (default: stdout)
+        format: Output format (default: the filter's first argument, as pandoc passes it)
+    """
+    if input_stream is None:
+        input_stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    if output_stream is None:
+        output_stream = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    doc, blocks = read_document(input_stream)
+    doc.format = format or (sys.argv[1] if len(sys.argv) > 1 else 'html')
+    if prepare:
+        prepare(doc)
+
+    # The head exactly as pf.dump writes it, with the blocks array left open
+    head = dumps({'pandoc-api-version': doc.api_version, 'meta': doc.metadata.content})
+    output_stream.write(head[:-1] + ',"blocks":[')
+    first = True
+
+    def write(out_blocks):
+        nonlocal first
+        for block in out_blocks:
+            output_stream.write(dumps(block) if first else ',' + dumps(block))
+            first = False
+
+    for block in blocks:
+        write(transform(block, doc))
+    if finish:
+        write(finish(doc))
+    output_stream.write(']}')
+    output_stream.flush()
@@ -0,0 +1,63 @@
+"""
+Table normalization for the CV filter.
+Collapses multirow cells into single rows in one pass over the table body.
+"""
+
+import panflute as pf
+
+
+def collapse_rowspans(body: pf.TableBody) -> pf.TableBody:
+    """
+    Merge rows joined by rowspans into their first row.
+
+    Pandoc represents a cell with rowspan > 1 once, in its first row; the rows it
+    spans (continuation rows) hold only the cells of the uncovered columns. Rows
+    connected by spans, including spans that start inside a continuation row and
+    overlap the first, form one group. Each group becomes its first row: every
+    continuation cell's content is appended to the first-row cell in the same
+    column, and all rowspans are reset to 1.
+
+    Runs in a single pass, linear in the number of cells.
+    """
+    rows = []
+    anchor = None    # first row of the current group
+    columns = {}     # column -> cell of the anchor row covering it
+    busy = {}        # column -> last row index covered by a span in that column
+    group_end = -1   # last row index covered by any span in the current group
+
+    for j, row in enumerate(body.content):
+        continuation = j <= group_end
+        if not continuation:
+            anchor = row
+            columns = {}
+            rows.append(row)
+
+        col = 0
+        for cell in row.content:
+            # Skip columns still covered by spans from earlier rows
+            while busy.get(col, -1) >= j:
+                col += 1
+            last_row = j + cell.rowspan - 1
+            group_end = max(group_end, last_row)
+
+            if continuation:
+                target = columns.get(col)
+                if target is None:
+                    # Column not present in the anchor row (ragged table): keep the cell there
+                    cell.rowspan = 1
+                    anchor.content.append(cell)
+                    target = cell
+                else:
+                    target.content.extend(cell.content)
+            else:
+                target = cell
+                cell.rowspan = 1
+
+            for c in range(col, col + cell.colspan):
+                busy[c] = last_row
+                columns.setdefault(c, target)
+            col += cell.colspan
+
+    if len(rows) != len(body.content):
+        body.content = rows
+    return body
@@ -0,0 +1,87 @@
+"""
+Opt-in timing instrumentation for the filters.
+
+Enabled by the SITE_TRACE environment variable or the `trace` document
+metadata field, either naming the output file. Each traced step is appended as
+one JSON line holding a Chrome trace "complete" event, so traces from parallel
+filter runs can share a file. Load it in chrome://tracing or Perfetto after
+wrapping the lines in a list, e.g. `jq -s . trace.jsonl > trace.json`.
+"""
+
+import json
+import os
+import threading
+import time
+
+TRACE_ENV = 'SITE_TRACE'
+
+_path = os.environ.get(TRACE_ENV) or None
+_lock = threading.Lock()
+
+
+def configure(doc):
+    """Enable tracing from the document's `trace` metadata unless SITE_TRACE is set"""
+    global _path
+    _path = os.environ.get(TRACE_ENV) or doc.get_metadata('trace', None) or None
+
+
+def emit(name: str, start_us: int, dur_us: float, args: dict):
+    event = {
+        'name': name,
+        'cat': 'filter',
+        'ph': 'X',
+        'ts': start_us,
+        'dur': round(dur_us, 1),
+        'pid': os.getpid(),
+        'tid': threading.get_ident(),
+        'args': args,
+    }
+    line = json.dumps(event) + "\n"
+    with _lock, open(_path, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+class Span:
+    """A running traced step; counts can be attached through `args`"""
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start_us = time.time_ns() // 1000
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        emit(self.name, self.start_us, (time.perf_counter() - self.started) * 1e6, self.args)
+        return False
+
+
+class _NullSpan:
+    """Stand-in returned when tracing is off; discards everything"""
+
+    def __init__(self):
+        self.args = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null = _NullSpan()
+
+
+def span(name: str, **args):
+    """
+    Context manager that records the duration of a step when tracing is on.
+
+        with tracing.span('news', posts=n) as s:
+            ...
+            s.args['read'] = read
+    """
+    if _path is None:
+        return _null
+    return Span(name, dict(args))